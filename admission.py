@@ -0,0 +1,164 @@
+"""
+Admission control for heavy endpoints
+Each limited route gets a concurrency limit and a bounded FIFO wait queue. Requests beyond the queue are shed at once
+with 429, requests that wait longer than the queue timeout get 503, both with Retry-After, so bursts on heavy routes
+cannot starve cheap ones.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import metrics
+
+ADMISSION_ACTIVE = metrics.registry.gauge(
+    "admission_active_requests", "Requests admitted and running per limited route", ("route",))
+ADMISSION_QUEUE_DEPTH = metrics.registry.gauge(
+    "admission_queue_depth", "Requests waiting for a slot per limited route", ("route",))
+ADMISSION_SHED = metrics.registry.counter(
+    "admission_shed_total", "Requests rejected by admission control", ("route", "reason"))
+ADMISSION_WAIT = metrics.registry.histogram(
+    "admission_queue_wait_seconds", "Time admitted requests spent queued", ("route",))
+
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+
+class RouteLimiter:
+    """Concurrency slots plus a bounded FIFO of waiters for one route; slots are handed directly to the next waiter"""
+
+    def __init__(self, route: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.route = route
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.shed = {QUEUE_FULL: 0, QUEUE_TIMEOUT: 0}
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _update_gauges(self):
+        ADMISSION_ACTIVE.set(self.active, route=self.route)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), route=self.route)
+
+    def _reject(self, reason: str) -> str:
+        self.shed[reason] += 1
+        ADMISSION_SHED.inc(route=self.route, reason=reason)
+        return reason
+
+    async def acquire(self) -> Optional[str]:
+        """Wait for a slot; returns None once admitted or the reason the request was shed"""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            self._update_gauges()
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return self._reject(QUEUE_FULL)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done() or waiter.cancelled():
+                return self._reject(QUEUE_TIMEOUT)
+            # release() handed over a slot just as the wait timed out; take it rather than leak it
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was handed over in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._update_gauges()
+        # The releasing request transferred its slot, so `active` is already counted
+        self.admitted += 1
+        ADMISSION_WAIT.observe(time.perf_counter() - start, route=self.route)
+        return None
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying RouteLimiters by route template; other routes pass straight through"""
+
+    def __init__(self, app, router_app, limits: Dict[str, Tuple[int, int]], queue_timeout: float = 10.0,
+                 retry_after: int = 5):
+        self.app = app
+        self.router_app = router_app
+        self.retry_after = retry_after
+        self.limiters = {route: RouteLimiter(route, concurrent, queue, queue_timeout)
+                         for route, (concurrent, queue) in limits.items()}
+        router_app.state.admission = self
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiters.get(metrics.route_template(self.router_app, scope))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await limiter.acquire()
+        if reason is not None:
+            await self._shed(send, reason, limiter)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _shed(self, send, reason: str, limiter: RouteLimiter):
+        status = 429 if reason == QUEUE_FULL else 503
+        detail = (f"Too many concurrent requests for {limiter.route}; retry later" if reason == QUEUE_FULL
+                  else f"Timed out waiting for capacity on {limiter.route}; retry later")
+        body = json.dumps({"detail": detail, "reason": reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(self.retry_after).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> Dict[str, Any]:
+        return {route: limiter.stats() for route, limiter in self.limiters.items()}
+
+
+def install(app, limits: Dict[str, Tuple[int, int]], queue_timeout: float = 10.0, retry_after: int = 5):
+    """Attach admission control to a FastAPI app; limits map route templates to (max concurrent, max queued)"""
+    app.add_middleware(AdmissionMiddleware, router_app=app, limits=limits, queue_timeout=queue_timeout,
+                       retry_after=retry_after)
+
+    @app.get("/api/admission", include_in_schema=False)
+    async def admission_stats():
+        """Per-route concurrency, queue depth and shed counts"""
+        controller = getattr(app.state, "admission", None)
+        return controller.stats() if controller is not None else {}
+
+    return app
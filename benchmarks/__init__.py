@@ -0,0 +1,6 @@
+"""
+Reproducible benchmark suite for the Honeywell Terminal Manager backends
+
+    python -m benchmarks.run --sizes 10k,100k --formats csv,json
+    python -m benchmarks.run --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
@@ -0,0 +1,163 @@
+"""
+Synthetic operational datasets for benchmarking
+Deterministic (seeded) CSV/JSON/XLSX files per operation type, in narrow and wide shapes
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+OPERATION_TYPES = ["terminal", "courier", "workforce", "energy"]
+SHAPES = ["narrow", "wide"]
+FORMATS = ["csv", "json", "xlsx"]
+
+WIDE_EXTRA_COLUMNS = 40
+XLSX_MAX_ROWS = 1_048_575  # Excel sheet limit minus the header row
+CHUNK_ROWS = 250_000
+
+# Categorical vocabularies per operation type, mirroring the UI's operational views
+CATEGORIES: Dict[str, Dict[str, List[str]]] = {
+    "terminal": {
+        "berth": [f"B{i}" for i in range(1, 9)],
+        "crane_id": [f"QC-{i:02d}" for i in range(1, 25)],
+        "status": ["active", "maintenance", "offline"],
+    },
+    "courier": {
+        "hub": ["north", "south", "east", "west", "central"],
+        "vehicle_id": [f"VAN-{i:03d}" for i in range(1, 61)],
+        "status": ["delivered", "in_transit", "delayed", "returned"],
+    },
+    "workforce": {
+        "shift": ["morning", "afternoon", "night"],
+        "team": [f"team_{i}" for i in range(1, 13)],
+        "status": ["on_duty", "break", "off_duty"],
+    },
+    "energy": {
+        "zone": [f"Z{i}" for i in range(1, 11)],
+        "meter_id": [f"M-{i:03d}" for i in range(1, 101)],
+        "status": ["active", "maintenance", "offline"],
+    },
+}
+
+# Numeric metrics per operation type: name -> (mean, std)
+METRICS: Dict[str, Dict[str, tuple]] = {
+    "terminal": {"containers_moved": (42, 9), "efficiency": (87.5, 4), "throughput": (1250, 180), "dwell_time": (4.3, 1.1)},
+    "courier": {"parcels": (120, 30), "efficiency": (91.2, 3), "throughput": (890, 120), "delivery_time": (3.7, 0.9)},
+    "workforce": {"headcount": (156, 12), "efficiency": (89.1, 3.5), "throughput": (2100, 250), "overtime_hours": (2.8, 1.2)},
+    "energy": {"consumption_kwh": (3450, 400), "efficiency": (92.8, 2), "throughput": (3450, 300), "peak_load_kw": (510, 60)},
+}
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes like 10k, 1.5M or 250000"""
+    value = value.strip().lower()
+    multiplier = 1
+    if value.endswith("k"):
+        multiplier, value = 1_000, value[:-1]
+    elif value.endswith("m"):
+        multiplier, value = 1_000_000, value[:-1]
+    return int(float(value) * multiplier)
+
+
+def format_size(rows: int) -> str:
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}M"
+    if rows >= 1_000 and rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+
+def generate_frame(operation_type: str, shape: str, rows: int, offset: int = 0, seed: int = 42) -> pd.DataFrame:
+    """Generate one block of rows; offset keeps timestamps continuous across chunks"""
+    rng = np.random.default_rng(seed + offset)
+    start = pd.Timestamp("2024-01-01") + pd.Timedelta(minutes=offset)
+    data = {
+        "timestamp": pd.date_range(start, periods=rows, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    for name, values in CATEGORIES[operation_type].items():
+        data[name] = np.asarray(values)[rng.integers(0, len(values), rows)]
+    for name, (mean, std) in METRICS[operation_type].items():
+        data[name] = np.round(rng.normal(mean, std, rows), 2)
+    if shape == "wide":
+        for i in range(WIDE_EXTRA_COLUMNS):
+            data[f"sensor_{i:02d}"] = np.round(rng.normal(100, 15, rows), 3)
+    return pd.DataFrame(data)
+
+
+def dataset_path(root: Path, operation_type: str, shape: str, rows: int, fmt: str) -> Path:
+    return root / f"bench_{operation_type}_{shape}_{format_size(rows)}.{fmt}"
+
+
+def ensure_dataset(root: Path, operation_type: str, shape: str, rows: int, fmt: str, seed: int = 42) -> Path:
+    """Generate the dataset file if it is not cached yet and return its path"""
+    if operation_type not in OPERATION_TYPES:
+        raise ValueError(f"Unknown operation type: {operation_type} (use one of {', '.join(OPERATION_TYPES)})")
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape: {shape} (use one of {', '.join(SHAPES)})")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if fmt == "xlsx" and rows > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX cannot hold {rows} rows (limit {XLSX_MAX_ROWS})")
+
+    root.mkdir(parents=True, exist_ok=True)
+    path = dataset_path(root, operation_type, shape, rows, fmt)
+    if path.exists():
+        return path
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        if fmt == "csv":
+            with open(tmp_path, "w", newline="") as f:
+                for offset in range(0, rows, CHUNK_ROWS):
+                    chunk = generate_frame(operation_type, shape, min(CHUNK_ROWS, rows - offset), offset, seed)
+                    chunk.to_csv(f, index=False, header=offset == 0)
+        elif fmt == "json":
+            # Records-oriented array, the layout pandas.read_json and the stdlib parser both accept
+            with open(tmp_path, "w") as f:
+                f.write("[")
+                for offset in range(0, rows, CHUNK_ROWS):
+                    chunk = generate_frame(operation_type, shape, min(CHUNK_ROWS, rows - offset), offset, seed)
+                    body = chunk.to_json(orient="records")[1:-1]
+                    if offset and body:
+                        f.write(",")
+                    f.write(body)
+                f.write("]")
+        elif fmt == "xlsx":
+            generate_frame(operation_type, shape, rows, 0, seed).to_excel(tmp_path, index=False, engine="openpyxl")
+    except BaseException:
+        # Never leave a partial file behind to be mistaken for a cached dataset later
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    tmp_path.replace(path)
+    return path
+
+
+def describe(path: Path) -> Dict[str, object]:
+    """Metadata recorded alongside results so runs on different inputs are never compared"""
+    return {"file": path.name, "bytes": path.stat().st_size}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark datasets")
+    parser.add_argument("--out", default="benchmarks/.datasets")
+    parser.add_argument("--sizes", default="10k,100k")
+    parser.add_argument("--formats", default="csv,json")
+    parser.add_argument("--shapes", default="narrow,wide")
+    parser.add_argument("--operations", default=",".join(OPERATION_TYPES))
+    args = parser.parse_args()
+
+    for op in args.operations.split(","):
+        for shape in args.shapes.split(","):
+            for size in args.sizes.split(","):
+                for fmt in args.formats.split(","):
+                    try:
+                        path = ensure_dataset(Path(args.out), op, shape, parse_size(size), fmt)
+                        print(json.dumps(describe(path)))
+                    except ValueError as e:
+                        print(f"⚠️ Skipped {op}/{shape}/{size}/{fmt}: {e}")
@@ -0,0 +1,330 @@
+"""
+Benchmark runner - drives main.py and simple_server.py in-process through the ASGI test client
+Measures throughput, p50/p99 latency and per-operation peak RSS for upload, /api/datasets, /api/operation-data and /api/chat
+and writes machine-readable JSON results that can be compared across commits
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULT_MARKER = "__BENCHMARK_RESULT__"
+
+SERVERS = {"main": "main", "simple": "simple_server"}
+OPERATIONS = ["upload", "datasets", "operation_data", "chat"]
+MIME_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+# --- Measurement helpers ---
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size since the last reset_peak_rss() (Linux), else of this process so far"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process right now (Linux only)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS counter so the next peak_rss_mb() covers only what follows (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def summarize(latencies: List[float], units: float, unit_name: str) -> Dict[str, Any]:
+    total = sum(latencies)
+    return {
+        "iterations": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(total / len(latencies) * 1000, 3) if latencies else 0.0,
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput": round(units * len(latencies) / total, 2) if total else 0.0,
+        "throughput_unit": unit_name,
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit or None, "dirty": dirty}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+# --- Case execution ---
+def load_app(server: str, data_dir: Path):
+    """Import a server module and point its data folder at an isolated directory"""
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    module = importlib.import_module(SERVERS[server])
+    module.DATA_FOLDER_PATH = str(data_dir)
+    return module.app
+
+
+def wait_for_startup_tasks():
+    """Let background startup work (parser calibration) finish so it does not bleed into the measurements"""
+    for thread in threading.enumerate():
+        if thread.name == "parser-calibration":
+            thread.join()
+
+
+def run_case(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Run every requested operation for one (server, operation type, shape, rows, format) case"""
+    from fastapi.testclient import TestClient
+    from benchmarks.datasets import ensure_dataset, describe
+
+    if spec.get("dataset"):
+        dataset = Path(spec["dataset"])
+    else:
+        dataset = ensure_dataset(Path(spec["dataset_dir"]), spec["operation_type"], spec["shape"], spec["rows"], spec["format"])
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_data_"))
+    op_type = spec["operation_type"]
+    records = []
+    try:
+        if "upload" not in spec["operations"]:
+            # The read paths need the dataset in place even when upload itself is not measured; copying it before
+            # startup lets the folder watcher's initial scan index it
+            shutil.copy(dataset, work_dir / f"{op_type}_{dataset.name}")
+
+        # Entering the client runs the app's lifespan (folder watcher, compactor, parser calibration)
+        with TestClient(load_app(spec["server"], work_dir)) as client:
+            wait_for_startup_tasks()
+            base = {key: spec[key] for key in ("server", "operation_type", "shape", "rows", "format")}
+            base["dataset"] = describe(dataset)
+
+            def measured(operation: str, run, units: float, unit_name: str):
+                # Peak RSS is reset per operation, so it and the delta cover that operation alone
+                peak_reset = reset_peak_rss()
+                baseline = current_rss_mb() if peak_reset else peak_rss_mb()
+                latencies, errors = run()
+                peak = peak_rss_mb()
+                records.append({
+                    **base, "operation": operation, "errors": errors, "peak_rss_mb": peak,
+                    "rss_delta_mb": round(peak - baseline, 1) if peak is not None and baseline is not None else None,
+                    "peak_rss_scope": "operation" if peak_reset else "process",
+                    **summarize(latencies, units, unit_name),
+                })
+
+            def timed_calls(call, iterations: int, warmup: int):
+                latencies, errors = [], 0
+                for _ in range(warmup):
+                    call()
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    response = call()
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code >= 400:
+                        errors += 1
+                return latencies, errors
+
+            if "upload" in spec["operations"]:
+                def upload():
+                    with open(dataset, "rb") as f:
+                        return client.post("/api/upload-data",
+                                           files={"files": (dataset.name, f, MIME_TYPES[spec["format"]])},
+                                           data={"operation_type": op_type})
+                measured("upload", lambda: timed_calls(upload, spec["upload_iterations"], 0), spec["rows"], "rows/s")
+
+            iterations, warmup = spec["iterations"], spec["warmup"]
+            if "datasets" in spec["operations"]:
+                measured("datasets", lambda: timed_calls(
+                    lambda: client.get("/api/datasets", params={"operation_type": op_type}), iterations, warmup), 1, "req/s")
+            if "operation_data" in spec["operations"]:
+                measured("operation_data", lambda: timed_calls(
+                    lambda: client.get(f"/api/operation-data/{op_type}"), iterations, warmup), 1, "req/s")
+            if "chat" in spec["operations"]:
+                payload = {"message": f"Analyze my {op_type} data", "operation_type": op_type}
+                measured("chat", lambda: timed_calls(
+                    lambda: client.post("/api/chat", json=payload), iterations, warmup), 1, "req/s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return records
+
+
+def run_isolated(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Run a case in a fresh interpreter so peak RSS reflects that case alone"""
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.run", "--worker", json.dumps(spec)],
+                          cwd=REPO_ROOT, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"Benchmark worker failed for {spec}: {proc.stderr.strip()[-2000:]}")
+
+
+# --- Comparison ---
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Print per-case deltas between two result files; returns the number of regressions"""
+    def index(path):
+        with open(path) as f:
+            results = json.load(f)
+        return results["meta"], {
+            (r["server"], r["operation"], r["operation_type"], r["shape"], r["rows"], r["format"]): r
+            for r in results["records"]
+        }
+
+    old_meta, old = index(old_path)
+    new_meta, new = index(new_path)
+    print(f"Comparing {old_meta.get('git', {}).get('commit')} -> {new_meta.get('git', {}).get('commit')}")
+    regressions = 0
+    for key in sorted(set(old) & set(new), key=str):
+        before, after = old[key], new[key]
+        deltas = {}
+        for metric in ("p50_ms", "p99_ms", "peak_rss_mb", "rss_delta_mb"):
+            if before.get(metric) and after.get(metric) is not None:
+                deltas[metric] = after[metric] / before[metric] - 1.0
+        regressed = [m for m, d in deltas.items() if d > threshold]
+        regressions += bool(regressed)
+        marker = "❌" if regressed else "✓"
+        summary = " ".join(f"{m}={d:+.1%}" for m, d in deltas.items())
+        print(f"{marker} {'/'.join(str(k) for k in key)}: {summary}")
+    for key in sorted(set(old) ^ set(new), key=str):
+        print(f"? {'/'.join(str(k) for k in key)}: only in {'old' if key in old else 'new'} results")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from benchmarks.datasets import FORMATS, OPERATION_TYPES, SHAPES, XLSX_MAX_ROWS, ensure_dataset, parse_size
+
+    parser = argparse.ArgumentParser(description="Benchmark the Terminal Manager backends in-process")
+    parser.add_argument("--servers", default=",".join(SERVERS), help="Comma-separated: main,simple")
+    parser.add_argument("--operation-types", default=",".join(OPERATION_TYPES))
+    parser.add_argument("--shapes", default=",".join(SHAPES))
+    parser.add_argument("--sizes", default="10k,100k", help="Row counts, e.g. 10k,100k,1M,10M")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--iterations", type=int, default=30, help="Timed calls per read operation")
+    parser.add_argument("--upload-iterations", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--dataset-dir", default=str(REPO_ROOT / "benchmarks" / ".datasets"))
+    parser.add_argument("--output", help="Result file (default benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--no-isolate", action="store_true", help="Run all cases in this process")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression threshold for --compare")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(RESULT_MARKER + json.dumps(run_case(json.loads(args.worker))))
+        return 0
+
+    if args.compare:
+        return 1 if compare(args.compare[0], args.compare[1], args.threshold) else 0
+
+    try:
+        import openpyxl  # noqa: F401
+        xlsx_available = True
+    except ImportError:
+        xlsx_available = False
+
+    records, skipped = [], []
+    for server in args.servers.split(","):
+        for op_type in args.operation_types.split(","):
+            for shape in args.shapes.split(","):
+                for size in args.sizes.split(","):
+                    rows = parse_size(size)
+                    for fmt in args.formats.split(","):
+                        case = f"{server}/{op_type}/{shape}/{size}/{fmt}"
+                        if fmt == "xlsx" and (not xlsx_available or rows > XLSX_MAX_ROWS):
+                            reason = "openpyxl not installed" if not xlsx_available else "exceeds XLSX row limit"
+                            skipped.append({"case": case, "reason": reason})
+                            print(f"⚠️ Skipping {case}: {reason}")
+                            continue
+                        # Generated here so dataset creation never counts towards a worker's memory or time
+                        try:
+                            dataset = ensure_dataset(Path(args.dataset_dir), op_type, shape, rows, fmt)
+                        except ValueError as e:
+                            skipped.append({"case": case, "reason": str(e)})
+                            print(f"⚠️ Skipping {case}: {e}")
+                            continue
+                        spec = {
+                            "server": server, "operation_type": op_type, "shape": shape, "rows": rows,
+                            "format": fmt, "operations": args.operations.split(","),
+                            "iterations": args.iterations, "upload_iterations": args.upload_iterations,
+                            "warmup": args.warmup, "dataset_dir": args.dataset_dir, "dataset": str(dataset),
+                        }
+                        print(f"▶ {case}")
+                        case_records = run_case(spec) if args.no_isolate else run_isolated(spec)
+                        for r in case_records:
+                            print(f"  {r['operation']:<15} p50={r['p50_ms']:>10.2f}ms p99={r['p99_ms']:>10.2f}ms "
+                                  f"{r['throughput']:>12.1f} {r['throughput_unit']:<7} rss={r['peak_rss_mb']}MB "
+                                  f"delta={r['rss_delta_mb']}MB")
+                        records.extend(case_records)
+
+    git = git_revision()
+    meta = {
+        "timestamp": datetime.now().isoformat(),
+        "git": git,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "isolated": not args.no_isolate,
+        "args": {k: v for k, v in vars(args).items() if k not in ("worker", "compare")},
+    }
+    output = Path(args.output) if args.output else (
+        REPO_ROOT / "benchmarks" / "results" /
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{(git['commit'] or 'nogit')[:8]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "records": records, "skipped": skipped}, f, indent=2)
+    print(f"📁 Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
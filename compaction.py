@@ -0,0 +1,118 @@
+"""
+Ingest-time dtype compaction for parsed datasets
+Low-cardinality strings become categoricals, integers and floats are downcast where lossless and timestamp strings
+are parsed to datetime64, so cached operational logs take a fraction of their default pandas footprint
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_MAX_UNIQUE_RATIO = 0.5  # Distinct values / non-null rows at or below which strings become categorical
+TIMESTAMP_SAMPLE_ROWS = 200
+INTEGER_TYPES = (np.int8, np.int16, np.int32)
+
+
+def _is_text(series) -> bool:
+    return series.dtype == object or isinstance(series.dtype, pd.StringDtype)
+
+
+def _looks_like_timestamps(series) -> bool:
+    sample = series.dropna().head(TIMESTAMP_SAMPLE_ROWS)
+    if sample.empty or not all(isinstance(v, str) and len(v) >= 8 for v in sample):
+        return False
+    return bool(pd.to_datetime(sample, errors="coerce").notna().all())
+
+
+def _compact_timestamps(series):
+    if not _looks_like_timestamps(series):
+        return None
+    try:
+        parsed = pd.to_datetime(series, errors="coerce")
+    except (TypeError, ValueError):
+        return None
+    # Only lossless conversions: every non-null value must parse
+    if parsed.isna().sum() != series.isna().sum():
+        return None
+    return parsed
+
+
+def _compact_integers(series):
+    if series.empty:
+        return None
+    low, high = series.min(), series.max()
+    for candidate in INTEGER_TYPES:
+        info = np.iinfo(candidate)
+        if np.dtype(candidate).itemsize >= series.dtype.itemsize:
+            return None
+        if info.min <= low and high <= info.max:
+            return series.astype(candidate)
+    return None
+
+
+def _compact_floats(series):
+    values = series.to_numpy()
+    finite = values[~np.isnan(values)]
+    if series.dtype.itemsize <= 4:
+        return None
+    # Whole numbers without gaps fit an integer type; otherwise float32 only when every value round-trips exactly
+    if finite.size == values.size and finite.size and np.array_equal(finite, np.round(finite)) \
+            and np.abs(finite).max() < 2 ** 31:
+        return _compact_integers(series.astype(np.int64))
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return None
+
+
+def compact_column(series, category_max_ratio: float = CATEGORY_MAX_UNIQUE_RATIO):
+    """Compacted copy of a column, or None when no cheaper lossless representation exists"""
+    if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+    if pd.api.types.is_integer_dtype(series) and isinstance(series.dtype, np.dtype):
+        return _compact_integers(series)
+    if pd.api.types.is_float_dtype(series) and isinstance(series.dtype, np.dtype):
+        return _compact_floats(series)
+    if not _is_text(series):
+        return None
+    parsed = _compact_timestamps(series)
+    if parsed is not None:
+        return parsed
+    non_null = int(series.notna().sum())
+    if non_null and series.nunique(dropna=True) / non_null <= category_max_ratio:
+        return series.astype("category")
+    return None
+
+
+def compact_frame(df, category_max_ratio: float = CATEGORY_MAX_UNIQUE_RATIO) -> Tuple[Any, Dict[str, Any]]:
+    """Compact every column; returns the new frame and a memory report (also kept in df.attrs["compaction"])"""
+    before = df.memory_usage(deep=True)
+    changed: Dict[str, Dict[str, str]] = {}
+    columns = {}
+    for col in df.columns:
+        compacted: Optional[Any] = compact_column(df[col], category_max_ratio)
+        if compacted is None:
+            continue
+        # Categoricals only pay off when the codes plus categories are smaller than the strings
+        if isinstance(compacted.dtype, pd.CategoricalDtype) \
+                and compacted.memory_usage(deep=True, index=False) >= before[col]:
+            continue
+        columns[col] = compacted
+        changed[str(col)] = {"from": str(df[col].dtype), "to": str(compacted.dtype)}
+
+    if columns:
+        df = df.copy(deep=False)  # Unchanged columns are shared, not copied
+        for col, values in columns.items():
+            df[col] = values
+    after = df.memory_usage(deep=True)
+    bytes_before, bytes_after = int(before.sum()), int(after.sum())
+    report = {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "ratio": round(bytes_before / bytes_after, 2) if bytes_after else None,
+        "columns": changed,
+    }
+    df.attrs["compaction"] = report
+    return df, report
+
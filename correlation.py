@@ -0,0 +1,195 @@
+"""
+Correlation and driver analysis over numeric columns
+Pearson and Spearman matrices come from blocked matrix products: rows are streamed in blocks and only p x p sums
+are accumulated, so memory is bounded by the block size and the column count, and missing values are handled
+pairwise. Driver rankings (which columns best explain a target KPI) are derived from the matrix alone.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("pearson", "spearman")
+DEFAULT_BLOCK_ROWS = 65_536
+# Columns treated as KPI targets when none are requested (normalized names, matched as substrings)
+DEFAULT_TARGET_HINTS = ("efficiency", "throughput", "productivity", "utilization", "moves_per_hour")
+
+
+def numeric_columns(df) -> List[str]:
+    return [c for c in df.columns
+            if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+
+
+def sample_frame(df, sample_rows: Optional[int], seed: int = 0):
+    """Uniform row sample without replacement (the whole frame when it is small enough)"""
+    if sample_rows is None or len(df) <= sample_rows:
+        return df
+    rows = np.random.default_rng(seed).choice(len(df), size=sample_rows, replace=False)
+    rows.sort()
+    return df.iloc[rows]
+
+
+def _rank_columns(matrix: np.ndarray) -> np.ndarray:
+    """Average ranks per column; NaN stays NaN so pairwise deletion still applies.
+
+    Ranks are taken over each column's own non-missing values rather than per pair, which only differs from a
+    pairwise Spearman when values are missing.
+    """
+    return pd.DataFrame(matrix).rank(method="average").to_numpy(dtype=np.float64)
+
+
+def correlation_matrix(matrix: np.ndarray, method: str = "pearson",
+                       block_rows: int = DEFAULT_BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairwise-complete correlation matrix and pair counts of an (n rows x p columns) float matrix.
+
+    Columns are centered on their means first for numerical stability. A row block with missing values
+    contributes four p x p products (pair counts, per-pair sums, sums of squares and cross products); a
+    complete block only needs the cross products.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown correlation method: {method}. Use one of {', '.join(METHODS)}")
+    if method == "spearman":
+        matrix = _rank_columns(matrix)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    p = matrix.shape[1]
+    with np.errstate(invalid="ignore"):
+        centers = np.nan_to_num(np.nanmean(matrix, axis=0)) if len(matrix) else np.zeros(p)
+
+    counts = np.zeros((p, p))
+    sums = np.zeros((p, p))  # sums[i, j]: sum of column i over rows where j is present too
+    squares = np.zeros((p, p))
+    cross = np.zeros((p, p))
+    for start in range(0, len(matrix), block_rows):
+        block = matrix[start:start + block_rows] - centers
+        present = ~np.isnan(block)
+        if present.all():
+            # Complete block: per-pair sums reduce to column sums, leaving a single product
+            counts += len(block)
+            sums += block.sum(axis=0)[:, None]
+            squares += (block * block).sum(axis=0)[:, None]
+            cross += block.T @ block
+            continue
+        values = np.where(present, block, 0.0)
+        mask = present.astype(np.float64)
+        counts += mask.T @ mask
+        sums += values.T @ mask
+        squares += (values * values).T @ mask
+        cross += values.T @ values
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = cross - sums * sums.T / counts
+        variance = squares - sums * sums / counts
+        corr = covariance / np.sqrt(variance * variance.T)
+    corr[counts < 3] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.diag(counts) >= 3, 1.0, np.nan))
+    return corr, counts
+
+
+def default_targets(columns: Sequence[str]) -> List[str]:
+    normalized = {c: str(c).strip().lower().replace(" ", "_") for c in columns}
+    return [c for c in columns if any(hint in normalized[c] for hint in DEFAULT_TARGET_HINTS)]
+
+
+def rank_drivers(corr: np.ndarray, columns: List[str], target: str, top: int = 10) -> Dict[str, Any]:
+    """Columns that best explain `target`: pairwise correlation plus standardized multivariate coefficients.
+
+    The coefficients solve R_xx b = r_xy on the correlation matrix (least squares, so collinear drivers do not
+    break it); R^2 = r_xy . b is the share of the target's variance the drivers explain together.
+    """
+    t = columns.index(target)
+    candidates = [i for i in range(len(columns)) if i != t and not np.isnan(corr[t, i])]
+    if not candidates:
+        return {"target": target, "drivers": [], "r_squared": None}
+    r_xy = corr[candidates, t]
+    r_xx = np.nan_to_num(corr[np.ix_(candidates, candidates)])
+    beta = np.linalg.lstsq(r_xx, r_xy, rcond=None)[0]
+    r_squared = float(np.clip(r_xy @ beta, 0.0, 1.0))
+    order = np.argsort(-np.abs(r_xy))[:top]
+    return {
+        "target": target,
+        "r_squared": round(r_squared, 4),
+        "drivers": [{
+            "column": columns[candidates[k]],
+            "correlation": round(float(r_xy[k]), 4),
+            "r_squared": round(float(r_xy[k] ** 2), 4),
+            "beta": round(float(beta[k]), 4),
+        } for k in order],
+    }
+
+
+def analyze(frame, method: str = "pearson", targets: Optional[List[str]] = None, top: int = 10,
+            block_rows: int = DEFAULT_BLOCK_ROWS) -> Dict[str, Any]:
+    """Correlation matrix and driver rankings over the numeric columns of a frame"""
+    columns = numeric_columns(frame)
+    if len(columns) < 2:
+        raise ValueError("At least two numeric columns are needed for a correlation analysis")
+    missing = [t for t in (targets or []) if t not in columns]
+    if missing:
+        raise ValueError(f"Targets are not numeric columns: {', '.join(map(str, missing))}")
+    matrix = frame[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    corr, counts = correlation_matrix(matrix, method, block_rows)
+    names = [str(c) for c in columns]
+    targets = [str(t) for t in targets] if targets else default_targets(names)
+    return {
+        "method": method,
+        "rows": int(len(frame)),
+        "columns": names,
+        "matrix": [[None if np.isnan(v) else round(float(v), 4) for v in row] for row in corr],
+        "pairs": int(np.count_nonzero(counts[np.triu_indices(len(names), 1)] >= 3)),
+        "drivers": [rank_drivers(corr, names, target, top) for target in targets],
+    }
+
+
+def top_pairs(result: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+    """Strongest off-diagonal correlations of an analysis result"""
+    names, matrix = result["columns"], result["matrix"]
+    pairs = [{"a": names[i], "b": names[j], "correlation": matrix[i][j]}
+             for i in range(len(names)) for j in range(i + 1, len(names)) if matrix[i][j] is not None]
+    return sorted(pairs, key=lambda pair: abs(pair["correlation"]), reverse=True)[:limit]
+
+
+class ResultCache:
+    """LRU of analysis results keyed by request parameters and dataset versions"""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(params: Dict[str, Any], versions: Sequence[str]) -> str:
+        payload = json.dumps({"params": params, "versions": list(versions)}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def latest(self, match: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+        """Most recently used result that satisfies `match` (does not count as a hit or change the order)"""
+        with self._lock:
+            return next((result for result in reversed(self._entries.values()) if match(result)), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
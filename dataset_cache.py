@@ -0,0 +1,144 @@
+"""
+In-process cache of parsed datasets
+Parsed DataFrames are kept under a byte budget (deep memory usage), keyed by dataset name and file version,
+evicted least-recently-used first. Concurrent requests for a cold dataset share a single parse.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def frame_bytes(df: Any) -> int:
+    """Actual memory held by a DataFrame, including object/string payloads"""
+    try:
+        return int(df.memory_usage(deep=True, index=True).sum())
+    except AttributeError:
+        return 0
+
+
+class _Flight:
+    """A load in progress; followers wait on it instead of parsing the same file again"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class DatasetCache:
+    """Byte-budgeted LRU of parsed DataFrames with single-flight loading.
+
+    Entries are keyed by (name, version); a new version of a file replaces the old entry. Cached frames are shared
+    between requests, so callers must treat them as read-only (copy before mutating).
+    """
+
+    def __init__(self, max_bytes: int, max_entry_fraction: float = 0.5):
+        self.max_bytes = max_bytes
+        # A single dataset larger than this share of the budget is served but not cached
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self._entries: "OrderedDict[str, Tuple[str, Any, int]]" = OrderedDict()
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.rejected = 0
+
+    def get_or_load(self, name: str, version: str, loader: Callable[[], Any]) -> Any:
+        """Cached frame for (name, version), calling loader() at most once across concurrent callers"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get((name, version))
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[(name, version)] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            flight.value = value
+            self._put(name, version, value)
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop((name, version), None)
+            flight.done.set()
+
+    def _put(self, name: str, version: str, value: Any):
+        size = frame_bytes(value)
+        with self._lock:
+            self._remove(name)
+            if size > self.max_entry_bytes:
+                self.rejected += 1
+                return
+            self._entries[name] = (version, value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                self.evicted_bytes += evicted_size
+
+    def _remove(self, name: str):
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def invalidate(self, name: str):
+        with self._lock:
+            self._remove(name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "rejected": self.rejected,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+                "datasets": [{"name": name, "version": version, "bytes": size}
+                             for name, (version, _, size) in reversed(self._entries.items())],
+            }
+
+    def metric_lines(self, prefix: str = "dataset_cache") -> List[str]:
+        """Prometheus exposition lines for metrics.registry.register_collector"""
+        stats = self.stats()
+        lines = []
+        for key, kind in (("hits", "counter"), ("misses", "counter"), ("coalesced", "counter"),
+                          ("evictions", "counter"), ("evicted_bytes", "counter"), ("rejected", "counter"),
+                          ("entries", "gauge"), ("bytes", "gauge"), ("max_bytes", "gauge")):
+            name = f"{prefix}_{key}_total" if kind == "counter" else f"{prefix}_{key}"
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {stats[key]}")
+        return lines
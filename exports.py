@@ -0,0 +1,179 @@
+"""
+Streaming exports
+DataFrame chunk iterators (dataset slices, rollups, join results) are encoded as CSV, NDJSON or Parquet one chunk at a
+time, optionally gzip-compressed on the fly, so the first bytes go out immediately and memory stays flat
+"""
+
+import zlib
+from typing import Any, Iterable, Iterator, List, Optional
+
+try:
+    import pandas as pd  # type: ignore
+except ImportError:  # Exports are only offered when pandas is available
+    pd = None
+
+# Optional Parquet output
+PARQUET_AVAILABLE = False
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+GZIP_MEDIA_TYPE = "application/gzip"
+
+
+def check_format(format: str):
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format: {format}. Use one of {', '.join(FORMATS)}")
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise ValueError("Parquet export requires pyarrow")
+
+
+def media_type(format: str, gzip: bool = False) -> str:
+    return GZIP_MEDIA_TYPE if gzip else FORMATS[format][0]
+
+
+def filename(stem: str, format: str, gzip: bool = False) -> str:
+    return f"{stem}.{FORMATS[format][1]}" + (".gz" if gzip else "")
+
+
+def filter_time_range(chunks: Iterable[Any], column: Optional[str], start: Optional[str] = None,
+                      end: Optional[str] = None) -> Iterator[Any]:
+    """Keep rows whose `column` timestamp lies in [start, end]; chunks pass through when no range is given"""
+    if column is None or (start is None and end is None):
+        yield from chunks
+        return
+    lower = pd.Timestamp(start) if start else None
+    upper = pd.Timestamp(end) if end else None
+    for chunk in chunks:
+        timestamps = pd.to_datetime(chunk[column], errors="coerce")
+        if getattr(timestamps.dt, "tz", None) is not None:
+            timestamps = timestamps.dt.tz_convert("UTC").dt.tz_localize(None)
+        mask = timestamps.notna()
+        if lower is not None:
+            mask &= timestamps >= lower
+        if upper is not None:
+            mask &= timestamps <= upper
+        if mask.any():
+            yield chunk.loc[mask]
+
+
+def limit_rows(chunks: Iterable[Any], limit: Optional[int]) -> Iterator[Any]:
+    if limit is None:
+        yield from chunks
+        return
+    remaining = limit
+    for chunk in chunks:
+        if remaining <= 0:
+            return
+        if len(chunk) > remaining:
+            chunk = chunk.iloc[:remaining]
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _encode_csv(chunks: Iterable[Any]) -> Iterator[bytes]:
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def _encode_ndjson(chunks: Iterable[Any]) -> Iterator[bytes]:
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        text = chunk.to_json(orient="records", lines=True, date_format="iso")
+        yield (text if text.endswith("\n") else text + "\n").encode("utf-8")
+
+
+class _StreamSink:
+    """Write-only file object collecting Parquet output until the generator drains it"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _encode_parquet(chunks: Iterable[Any]) -> Iterator[bytes]:
+    """One row group per chunk; the schema is fixed by the first chunk and later chunks are cast to it"""
+    sink = _StreamSink()
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), table.schema)
+        else:
+            table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+        writer.write_table(table)
+        data = sink.drain()
+        if data:
+            yield data
+    if writer is None:
+        return
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def encode(chunks: Iterable[Any], format: str) -> Iterator[bytes]:
+    if format == "csv":
+        return _encode_csv(chunks)
+    if format == "ndjson":
+        return _encode_ndjson(chunks)
+    return _encode_parquet(chunks)
+
+
+def gzip_stream(blocks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """gzip container around a byte stream; every block is flushed so the client keeps receiving data"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush(zlib.Z_FINISH)
+
+
+def stream(chunks: Iterable[Any], format: str, gzip: bool = False, on_rows=None) -> Iterator[bytes]:
+    """Encoded (and optionally gzipped) export; on_rows(n) is called per chunk for accounting"""
+    def counted():
+        for chunk in chunks:
+            if on_rows is not None:
+                on_rows(len(chunk))
+            yield chunk
+
+    blocks = encode(counted(), format)
+    return gzip_stream(blocks) if gzip else blocks
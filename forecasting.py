@@ -0,0 +1,249 @@
+"""
+Batch forecasting of KPI time series
+Every series of an operation type is forecast in one vectorized pass: additive Holt-Winters recursions run over all
+series (and, when fitting, all smoothing-parameter combinations) at once as NumPy vectors, next to a seasonal naive
+baseline. Fitted states are kept, so when data is appended only the new buckets are run through the recursion.
+"""
+
+import threading
+import warnings
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Smoothing-parameter grid searched per series on a full fit
+ALPHAS = (0.1, 0.3, 0.5, 0.8)
+BETAS = (0.0, 0.05, 0.2)
+GAMMAS = (0.05, 0.2, 0.5)
+Z_80 = 1.2816
+Z_95 = 1.96
+
+
+def season_length(bucket_seconds: int) -> int:
+    """Seasonal period in buckets: weekly for daily data, daily for hourly-or-coarser, else hourly"""
+    if bucket_seconds >= 86400:
+        return 7
+    daily = 86400 // bucket_seconds
+    if bucket_seconds >= 3600 or daily <= 96:
+        return max(daily, 1)
+    return max(3600 // bucket_seconds, 1)
+
+
+@contextmanager
+def _quiet_nan_mean():
+    """Silence "mean of empty slice" for series that are all-missing in a window"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        yield
+
+
+def _initial_state(Y: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Level and trend from the first two seasons, seasonal indices from the first one (state at bucket m - 1)"""
+    with _quiet_nan_mean():
+        first = np.nanmean(Y[:, :m], axis=1)
+        second = np.nanmean(Y[:, m:2 * m], axis=1) if Y.shape[1] >= 2 * m else first
+    trend = np.nan_to_num((second - first) / m)
+    level = first + trend * (m - 1) / 2
+    season = np.nan_to_num(Y[:, :m] - first[:, None]) if m > 1 else np.zeros((len(Y), 1))
+    return level, trend, season
+
+
+def _recurse(Y: np.ndarray, alpha, beta, gamma, state: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Run additive Holt-Winters over the columns of Y (rows are independent series) from `state`.
+
+    Missing values advance the state without an update. One-step errors are accumulated in sse/sae/n.
+    """
+    level = state["level"].copy()
+    trend = state["trend"].copy()
+    season = state["season"].copy()
+    sse, sae, n = state["sse"].copy(), state["sae"].copy(), state["n"].copy()
+    m = season.shape[1]
+    phase = int(state["phase"])
+    for t in range(Y.shape[1]):
+        index = (phase + t) % m
+        seasonal = season[:, index]
+        y = Y[:, t]
+        observed = ~np.isnan(y)
+        projected = level + trend
+        error = np.where(observed, y - projected - seasonal, 0.0)
+        sse += error * error
+        sae += np.abs(error)
+        n += observed
+        new_level = np.where(observed, alpha * (y - seasonal) + (1 - alpha) * projected, projected)
+        trend = np.where(observed, beta * (new_level - level) + (1 - beta) * trend, trend)
+        season[:, index] = np.where(observed, gamma * (y - new_level) + (1 - gamma) * seasonal, seasonal)
+        level = new_level
+    return {"level": level, "trend": trend, "season": season, "sse": sse, "sae": sae, "n": n,
+            "phase": (phase + Y.shape[1]) % m}
+
+
+def fit(Y: np.ndarray, m: int) -> Dict[str, Any]:
+    """Grid-search smoothing parameters for every series at once; returns the best state per series"""
+    N = len(Y)
+    gammas = GAMMAS if m > 1 else (0.0,)
+    grid = np.array([(a, b, g) for a in ALPHAS for b in BETAS for g in gammas])
+    G = len(grid)
+    level, trend, season = _initial_state(Y, m)
+    expanded = {
+        "level": np.repeat(level, G), "trend": np.repeat(trend, G), "season": np.repeat(season, G, axis=0),
+        "sse": np.zeros(N * G), "sae": np.zeros(N * G), "n": np.zeros(N * G), "phase": 0,
+    }
+    params = np.tile(grid, (N, 1))
+    result = _recurse(np.repeat(Y[:, m:], G, axis=0), params[:, 0], params[:, 1], params[:, 2], expanded)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mse = (result["sse"] / result["n"]).reshape(N, G)
+    best = np.argmin(np.where(np.isnan(mse), np.inf, mse), axis=1)
+    rows = np.arange(N) * G + best
+    return {
+        "alpha": grid[best, 0], "beta": grid[best, 1], "gamma": grid[best, 2],
+        "level": result["level"][rows], "trend": result["trend"][rows], "season": result["season"][rows],
+        "sse": result["sse"][rows], "sae": result["sae"][rows], "n": result["n"][rows], "phase": result["phase"],
+    }
+
+
+def update(state: Dict[str, Any], Y: np.ndarray) -> Dict[str, Any]:
+    """Continue fitted series over new buckets with their chosen parameters"""
+    result = _recurse(Y, state["alpha"], state["beta"], state["gamma"], state)
+    return {**state, **result}
+
+
+def holt_winters_forecast(state: Dict[str, Any], horizon: int) -> Dict[str, np.ndarray]:
+    """Point forecasts and 80/95% intervals (additive Holt-Winters variance approximation)"""
+    m = state["season"].shape[1]
+    steps = np.arange(1, horizon + 1)
+    seasonal = state["season"][:, (state["phase"] + steps - 1) % m]
+    point = state["level"][:, None] + steps[None, :] * state["trend"][:, None] + seasonal
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma = np.sqrt(state["sse"] / np.maximum(state["n"], 1))
+    lags = np.arange(1, horizon)
+    c = (state["alpha"][:, None] * (1 + lags[None, :] * state["beta"][:, None])
+         + state["gamma"][:, None] * (lags[None, :] % m == 0))
+    spread = np.sqrt(1 + np.concatenate([np.zeros((len(point), 1)), np.cumsum(c * c, axis=1)], axis=1))
+    return _with_intervals(point, sigma[:, None] * spread)
+
+
+def seasonal_naive(Y: np.ndarray, m: int, horizon: int) -> Dict[str, np.ndarray]:
+    """Repeat the last observed season; the error scale comes from seasonal differences of the history"""
+    with _quiet_nan_mean():
+        last = Y[:, -m:]
+        fallback = np.nanmean(Y, axis=1)
+        last = np.where(np.isnan(last), fallback[:, None], last)
+        steps = np.arange(horizon)
+        point = last[:, steps % m]
+        differences = Y[:, m:] - Y[:, :-m] if Y.shape[1] > m else np.full((len(Y), 1), np.nan)
+        sigma = np.sqrt(np.nanmean(differences * differences, axis=1))
+        mae = np.nanmean(np.abs(differences), axis=1)
+    forecast = _with_intervals(point, sigma[:, None] * np.sqrt(steps // m + 1)[None, :])
+    forecast["mae"] = mae
+    return forecast
+
+
+def _with_intervals(point: np.ndarray, scale: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "point": point,
+        "lower80": point - Z_80 * scale, "upper80": point + Z_80 * scale,
+        "lower95": point - Z_95 * scale, "upper95": point + Z_95 * scale,
+    }
+
+
+class BatchForecaster:
+    """Forecasts aligned series matrices, keeping fitted states per key for incremental refits.
+
+    The last bucket may still be filling up, so states are stored as of the bucket before it ("settled") and
+    the latest bucket is replayed on every request. States are anchored on the timestamp of their last settled
+    bucket, not on a position, so they stay usable when the history window slides forward. A stored state is
+    reused when that bucket is still in the window and the settled history both requests see is unchanged; only
+    the buckets after it then run through the recursion. Parameters are re-searched when the appended part
+    exceeds refit_fraction of the fitted history.
+    """
+
+    def __init__(self, refit_fraction: float = 0.25, max_states: int = 32):
+        self.refit_fraction = refit_fraction
+        self.max_states = max_states
+        self._states: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def forecast(self, key: Any, names: List[str], Y: np.ndarray, m: int, horizon: int,
+                 index: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Forecast every row of Y (series x buckets) `horizon` buckets ahead with both models.
+
+        `index` holds the buckets' timestamps (default: their positions); it must increase.
+        """
+        index = np.arange(Y.shape[1]) if index is None else np.asarray(index)
+        settled = Y.shape[1] - 1
+        m = m if settled >= 2 * m + 2 else 1  # Too little history for seasonality: Holt's linear trend
+        if settled < m + 2:
+            raise ValueError(f"At least {m + 3} buckets of history are needed to forecast")
+
+        with self._lock:
+            cached = self._states.get(key)
+        resume = self._resume_position(cached, names, m, Y, index, settled)
+        mode = "full"
+        if resume is not None and settled - resume <= self.refit_fraction * cached["fitted"]:
+            state = cached["state"]
+            if settled > resume:
+                state = update(state, Y[:, resume:settled])
+                mode = "incremental"
+            else:
+                mode = "cached"
+            fitted = cached["fitted"]
+        else:
+            state = fit(Y[:, :settled], m)
+            fitted = settled
+        with self._lock:
+            self._states[key] = {"names": names, "m": m, "fitted": fitted, "state": state,
+                                 "index": index[:settled].copy(), "history": Y[:, :settled].copy()}
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_states:
+                self._states.popitem(last=False)
+
+        current = update(state, Y[:, settled:])
+        holt_winters = holt_winters_forecast(current, horizon)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            holt_winters["mae"] = current["sae"] / current["n"]
+        naive = seasonal_naive(Y, m, horizon)
+        return {"mode": mode, "season_length": m, "state": current, "holt_winters": holt_winters, "naive": naive}
+
+    @staticmethod
+    def _resume_position(cached: Optional[Dict[str, Any]], names: List[str], m: int, Y: np.ndarray,
+                         index: np.ndarray, settled: int) -> Optional[int]:
+        """Column of Y right after the cached state's last settled bucket, or None when the state cannot be
+        continued (other series or season, that bucket no longer settled here, or the shared history changed)"""
+        if cached is None or cached["names"] != names or cached["m"] != m or not len(cached["index"]):
+            return None
+        anchor = cached["index"][-1]
+        position = int(np.searchsorted(index[:settled], anchor))
+        if position >= settled or index[position] != anchor:
+            return None
+        shared = min(position + 1, len(cached["index"]))
+        if not (np.array_equal(index[position + 1 - shared:position + 1], cached["index"][-shared:])
+                and np.array_equal(Y[:, position + 1 - shared:position + 1], cached["history"][:, -shared:],
+                                   equal_nan=True)):
+            return None
+        return position + 1
+
+
+def series_results(names: List[str], result: Dict[str, Any], digits: int = 4) -> List[Dict[str, Any]]:
+    """Per-series output choosing the model with the lower one-step MAE"""
+    def values(array, i):
+        return [None if np.isnan(v) else round(float(v), digits) for v in array[i]]
+
+    state, hw, naive = result["state"], result["holt_winters"], result["naive"]
+    output = []
+    for i, name in enumerate(names):
+        hw_mae, naive_mae = hw["mae"][i], naive["mae"][i]
+        use_naive = not np.isnan(naive_mae) and (np.isnan(hw_mae) or naive_mae < hw_mae)
+        chosen = naive if use_naive else hw
+        output.append({
+            "name": name,
+            "model": "seasonal_naive" if use_naive else "holt_winters",
+            "params": {"alpha": float(state["alpha"][i]), "beta": float(state["beta"][i]),
+                       "gamma": float(state["gamma"][i])},
+            "mae": {"holt_winters": None if np.isnan(hw_mae) else round(float(hw_mae), digits),
+                    "seasonal_naive": None if np.isnan(naive_mae) else round(float(naive_mae), digits)},
+            **{k: values(chosen[k], i) for k in ("point", "lower80", "upper80", "lower95", "upper95")},
+        })
+    return output
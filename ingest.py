@@ -0,0 +1,421 @@
+"""
+Pluggable dataset parsing
+One ingestion interface over interchangeable backends: the stdlib csv/json modules, pandas (C or pyarrow engine)
+and pyarrow's multithreaded CSV reader. A backend is chosen per file by availability, format and size; a small
+calibration benchmark measures each available backend's fixed and per-byte cost on this machine, so small files
+go to the backend with the least overhead and large ones to the one with the best throughput.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pandas as pd  # type: ignore
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.csv as pa_csv  # type: ignore
+    import pyarrow.compute as pa_compute  # type: ignore
+except ImportError:
+    pa = None
+    pa_csv = None
+    pa_compute = None
+
+FORMATS = {".csv": "csv", ".json": "json", ".xlsx": "xlsx"}
+SAMPLE_VALUES = 5
+MAX_TRACKED_UNIQUES = 10_000  # Distinct values tracked per column by the streaming profiler
+DATE_HINTS = ("date", "time")
+CALIBRATION_SIZES = (64 * 1024, 4 * 1024 * 1024)  # Synthetic CSV sizes timed per backend
+# read_csv's default missing-value markers and boolean spellings; the stdlib backend applies them too, so a file
+# gets the same dtypes whichever backend calibration picks
+CSV_NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA",
+    "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+CSV_TRUE_VALUES = frozenset(["True", "TRUE", "true"])
+CSV_FALSE_VALUES = frozenset(["False", "FALSE", "false"])
+
+
+def file_format(path: Path) -> Optional[str]:
+    return FORMATS.get(Path(path).suffix.lower())
+
+
+def _parse_number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _looks_like_date(value: str) -> bool:
+    try:
+        datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class _ColumnProfile:
+    """Running statistics of one column for the streaming (no pandas) profiler"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.nulls = 0
+        self.values = 0
+        self.numeric = 0
+        self.dates = 0
+        self.uniques = set()
+        self.samples: List[Any] = []
+
+    def add(self, value: Any):
+        if value is None or value == "":
+            self.nulls += 1
+            return
+        self.values += 1
+        if len(self.uniques) < MAX_TRACKED_UNIQUES:
+            self.uniques.add(value if not isinstance(value, (dict, list)) else json.dumps(value, sort_keys=True))
+        number = value if isinstance(value, (int, float)) and not isinstance(value, bool) else (
+            _parse_number(value) if isinstance(value, str) else None)
+        if number is not None:
+            self.numeric += 1
+            value = number
+        elif isinstance(value, str) and self.dates == self.values - 1 and _looks_like_date(value):
+            self.dates += 1  # Only checked while every value so far was a date
+        if len(self.samples) < SAMPLE_VALUES:
+            self.samples.append(value)
+
+    def result(self) -> Dict[str, Any]:
+        if self.values and self.numeric == self.values:
+            col_type = "number"
+        elif self.values and self.dates == self.values:
+            col_type = "date"
+        elif not self.values and any(hint in self.name.lower() for hint in DATE_HINTS):
+            col_type = "date"
+        else:
+            col_type = "string"
+        return {
+            "name": self.name,
+            "type": col_type,
+            "null_count": self.nulls,
+            "unique_count": len(self.uniques),
+            "sample_values": self.samples,
+        }
+
+
+def profile_frame(df) -> Dict[str, Any]:
+    """Row count and column profile of a DataFrame, in the DatasetInfo column format"""
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        is_number = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        columns.append({
+            "name": str(col),
+            "type": "number" if is_number else "date" if pd.api.types.is_datetime64_any_dtype(series) else "string",
+            "null_count": int(series.isnull().sum()),
+            "unique_count": int(series.nunique()),
+            "sample_values": series.dropna().head(SAMPLE_VALUES).tolist(),
+        })
+    return {"row_count": int(len(df)), "columns": columns}
+
+
+class ParserBackend:
+    """A way to read dataset files; subclasses declare the formats they handle and whether they can run here"""
+
+    name = "base"
+    formats: Tuple[str, ...] = ()
+
+    def available(self) -> bool:
+        return False
+
+    def supports(self, fmt: str, frame: bool) -> bool:
+        return fmt in self.formats and self.available() and (not frame or pd is not None)
+
+    def read_frame(self, path: Path):
+        raise NotImplementedError
+
+    def iter_frames(self, path: Path, chunk_rows: int, columns: Optional[Sequence[str]] = None) -> Iterator[Any]:
+        """A file as DataFrames of up to chunk_rows rows; backends that cannot stream slice a full read"""
+        df = self.read_frame(path)
+        if columns is not None:
+            df = df[list(columns)]
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+    def profile(self, path: Path) -> Dict[str, Any]:
+        return profile_frame(self.read_frame(path))
+
+
+class StdlibBackend(ParserBackend):
+    """csv/json modules only: works everywhere, profiles in one streaming pass"""
+
+    name = "stdlib"
+    formats = ("csv", "json")
+
+    def available(self) -> bool:
+        return True
+
+    def _records(self, path: Path):
+        """(header, iterator of rows) for CSV, or (keys, list of dicts) for a JSON array of objects"""
+        if file_format(path) == "csv":
+            f = open(path, "r", encoding="utf-8", newline="")
+            reader = csv.reader(f)
+            header = next(reader, [])
+
+            def rows():
+                try:
+                    for row in reader:
+                        if row and (len(row) > 1 or row[0].strip()):  # read_csv skips blank lines
+                            yield row
+                finally:
+                    f.close()
+            return header, rows()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = [data]
+        keys = list(dict.fromkeys(k for item in data if isinstance(item, dict) for k in item))
+        return keys, ([item.get(k) for k in keys] if isinstance(item, dict) else [item] for item in data)
+
+    def profile(self, path: Path) -> Dict[str, Any]:
+        header, rows = self._records(path)
+        columns = [_ColumnProfile(str(name)) for name in header]
+        count = 0
+        for row in rows:
+            count += 1
+            for i, column in enumerate(columns):
+                column.add(row[i] if i < len(row) else None)
+        return {"row_count": count, "columns": [c.result() for c in columns]}
+
+    @staticmethod
+    def _convert(df):
+        """Columns of CSV strings -> read_csv's default dtypes: NA markers, then bool, numeric or string"""
+        flags = {**{v: True for v in CSV_TRUE_VALUES}, **{v: False for v in CSV_FALSE_VALUES}}
+        for col in df.columns:
+            missing = df[col].isna() | df[col].isin(CSV_NA_VALUES)
+            values = df[col].astype(object).where(~missing, None)
+            present = int((~missing).sum())
+            if not present:
+                df[col] = values.astype("float64")
+            elif values[~missing].isin(flags.keys()).all():
+                mapped = values.map(flags)
+                df[col] = mapped.astype(bool) if present == len(values) else mapped
+            else:
+                numbers = pd.to_numeric(values, errors="coerce")
+                df[col] = numbers if int(numbers.notna().sum()) == present else df[col].where(~missing)
+        return df
+
+    def read_frame(self, path: Path):
+        header, rows = self._records(path)
+        df = pd.DataFrame(list(rows), columns=header)
+        return self._convert(df) if file_format(path) == "csv" else df
+
+    def iter_frames(self, path: Path, chunk_rows: int, columns: Optional[Sequence[str]] = None) -> Iterator[Any]:
+        if file_format(path) != "csv":
+            yield from super().iter_frames(path, chunk_rows, columns)
+            return
+        header, rows = self._records(path)
+        wanted = list(columns) if columns is not None else header
+        positions = [header.index(name) for name in wanted]
+        batch = []
+        for row in rows:
+            batch.append([row[i] if i < len(row) else "" for i in positions])
+            if len(batch) == chunk_rows:
+                yield self._convert(pd.DataFrame(batch, columns=wanted))
+                batch = []
+        if batch:
+            yield self._convert(pd.DataFrame(batch, columns=wanted))
+
+
+class PandasBackend(ParserBackend):
+    """pandas readers; engine="pyarrow" uses pyarrow's multithreaded CSV parser underneath"""
+
+    def __init__(self, engine: str = "c"):
+        self.engine = engine
+        self.name = f"pandas-{engine}"
+        self.formats = ("csv", "json", "xlsx") if engine == "c" else ("csv",)
+
+    def available(self) -> bool:
+        return pd is not None and (self.engine == "c" or pa is not None)
+
+    def read_frame(self, path: Path):
+        fmt = file_format(path)
+        if fmt == "csv":
+            return pd.read_csv(path, engine=self.engine)
+        if fmt == "json":
+            return pd.read_json(path)
+        return pd.read_excel(path)
+
+    def iter_frames(self, path: Path, chunk_rows: int, columns: Optional[Sequence[str]] = None) -> Iterator[Any]:
+        if file_format(path) != "csv" or self.engine != "c":
+            yield from super().iter_frames(path, chunk_rows, columns)  # The pyarrow engine has no chunksize
+            return
+        with pd.read_csv(path, chunksize=chunk_rows, usecols=columns) as reader:
+            yield from reader
+
+
+class ArrowCSVBackend(ParserBackend):
+    """pyarrow.csv with threaded block parsing; profiles with Arrow compute kernels without pandas"""
+
+    name = "pyarrow-csv"
+    formats = ("csv",)
+
+    def available(self) -> bool:
+        return pa_csv is not None
+
+    def _table(self, path: Path):
+        return pa_csv.read_csv(path, read_options=pa_csv.ReadOptions(use_threads=True))
+
+    def read_frame(self, path: Path):
+        return self._table(path).to_pandas()
+
+    def profile(self, path: Path) -> Dict[str, Any]:
+        table = self._table(path)
+        columns = []
+        for name, column in zip(table.column_names, table.columns):
+            kind = column.type
+            col_type = ("number" if pa.types.is_integer(kind) or pa.types.is_floating(kind) else
+                        "date" if pa.types.is_timestamp(kind) or pa.types.is_date(kind) else "string")
+            non_null = pa_compute.drop_null(column)
+            columns.append({
+                "name": name,
+                "type": col_type,
+                "null_count": column.null_count,
+                "unique_count": len(pa_compute.unique(column)) - (1 if column.null_count else 0),
+                "sample_values": non_null.slice(0, SAMPLE_VALUES).to_pylist(),
+            })
+        return {"row_count": table.num_rows, "columns": columns}
+
+
+def default_backends() -> List[ParserBackend]:
+    """All known backends in static preference order (used until calibration has run)"""
+    return [ArrowCSVBackend(), PandasBackend("pyarrow"), PandasBackend("c"), StdlibBackend()]
+
+
+def _synthetic_csv(size: int) -> bytes:
+    """Typical operations log: a timestamp, a categorical and a few numeric columns"""
+    out = io.StringIO()
+    out.write("timestamp,unit,status,throughput,efficiency,queue\n")
+    i = 0
+    while out.tell() < size:
+        out.write(f"2024-01-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00,U{i % 40},"
+                  f"{('active', 'idle', 'maintenance')[i % 3]},{1000 + i % 517},{80 + (i % 200) / 10},{i % 37}\n")
+        i += 1
+    return out.getvalue().encode()
+
+
+class ParserSelector:
+    """Chooses a backend per file; calibrate() replaces the static preference with measured cost models"""
+
+    def __init__(self, backends: Optional[List[ParserBackend]] = None, forced: Optional[str] = None):
+        self.backends = backends or default_backends()
+        self.forced = forced
+        self.calibration: Dict[str, Dict[str, Dict[str, float]]] = {}  # mode -> backend -> {overhead, per_mb}
+        self._lock = threading.Lock()
+
+    def candidates(self, fmt: str, frame: bool) -> List[ParserBackend]:
+        return [b for b in self.backends if b.supports(fmt, frame)]
+
+    def choose(self, path: Path, frame: bool = True) -> ParserBackend:
+        """Backend for a file: forced if available, else cheapest by calibrated cost, else first by preference"""
+        fmt = file_format(path)
+        candidates = self.candidates(fmt, frame)
+        if not candidates:
+            raise ValueError(f"No parser available for {Path(path).suffix} files")
+        if self.forced:
+            for backend in candidates:
+                if backend.name == self.forced:
+                    return backend
+        costs = self.calibration.get("frame" if frame else "profile", {})
+        measured = [b for b in candidates if b.name in costs]
+        if fmt != "csv" or not measured:
+            return candidates[0]
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        return min(measured, key=lambda b: costs[b.name]["overhead"] + costs[b.name]["per_mb"] * size_mb)
+
+    def read_frame(self, path: Path):
+        return self.choose(path, frame=True).read_frame(path)
+
+    def iter_frames(self, path: Path, chunk_rows: int, columns: Optional[Sequence[str]] = None) -> Iterator[Any]:
+        return self.choose(path, frame=True).iter_frames(path, chunk_rows, columns)
+
+    def profile(self, path: Path) -> Dict[str, Any]:
+        """Row count and column profile, with pandas when available and the streaming profiler otherwise"""
+        return self.choose(path, frame=pd is not None).profile(path)
+
+    def calibrate(self, cache_path: Optional[Path] = None, repeats: int = 3) -> Dict[str, Any]:
+        """Time each CSV backend on two synthetic file sizes and fit cost = overhead + per_mb * size.
+
+        Results are stored in cache_path and reused while the set of available backends is unchanged.
+        """
+        frame = pd is not None
+        mode = "frame" if frame else "profile"
+        backends = self.candidates("csv", frame)
+        signature = sorted(b.name for b in backends)
+        if cache_path is not None:
+            try:
+                with open(cache_path) as f:
+                    cached = json.load(f)
+                if cached.get("mode") == mode and cached.get("backends") == signature:
+                    with self._lock:
+                        self.calibration[mode] = cached["costs"]
+                    return cached
+            except (OSError, ValueError):
+                pass
+
+        costs = {}
+        with tempfile.TemporaryDirectory() as folder:
+            timings: Dict[str, List[float]] = {b.name: [] for b in backends}
+            sizes = []
+            for size in CALIBRATION_SIZES:
+                path = Path(folder) / f"calibration_{size}.csv"
+                path.write_bytes(_synthetic_csv(size))
+                sizes.append(path.stat().st_size / (1024 * 1024))
+                for backend in backends:
+                    best = float("inf")
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        backend.read_frame(path) if frame else backend.profile(path)
+                        best = min(best, time.perf_counter() - start)
+                    timings[backend.name].append(best)
+            for name, (small, large) in timings.items():
+                per_mb = max((large - small) / (sizes[1] - sizes[0]), 0.0)
+                costs[name] = {"overhead": max(small - per_mb * sizes[0], 0.0), "per_mb": per_mb}
+
+        result = {"mode": mode, "backends": signature, "costs": costs, "calibrated_at": time.time()}
+        with self._lock:
+            self.calibration[mode] = costs
+        if cache_path is not None:
+            try:
+                Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_path, "w") as f:
+                    json.dump(result, f)
+            except OSError:
+                pass
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """Available backends, calibrated costs and the backend chosen for a few CSV sizes"""
+        frame = pd is not None
+        costs = self.calibration.get("frame" if frame else "profile", {})
+        choices = {}
+        for label, size_mb in (("1MB", 1), ("100MB", 100), ("1GB", 1024)):
+            measured = [b for b in self.candidates("csv", frame) if b.name in costs]
+            if measured:
+                choices[label] = min(measured, key=lambda b: costs[b.name]["overhead"] + costs[b.name]["per_mb"] * size_mb).name
+        return {
+            "available": [b.name for b in self.backends if b.available()],
+            "forced": self.forced,
+            "mode": "frame" if frame else "profile",
+            "costs": costs,
+            "csv_choice": choices,
+        }
@@ -0,0 +1,277 @@
+"""
+Cross-dataset join engine
+Aligns datasets of different operation types on a timestamp or key column with hash, sort-merge or
+as-of (nearest earlier) joins. The first dataset is streamed chunk by chunk against prepared build sides,
+results are produced lazily and materialized results are cached per input version.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import ingest
+import rollups
+
+STRATEGIES = ("auto", "hash", "sort_merge", "asof")
+JOIN_TYPES = ("inner", "left")
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def iter_dataset_chunks(file_path: Path, chunk_rows: int, reader: Callable[[Path], Any],
+                        columns: Optional[Sequence[str]] = None,
+                        chunk_reader: Optional[Callable[..., Iterator[Any]]] = None) -> Iterator[Any]:
+    """Yield a dataset in row chunks; with a chunk_reader (path, chunk_rows, columns) CSV is read incrementally,
+    everything else is loaded with reader and sliced.
+
+    Segmented snapshots are streamed segment by segment.
+    """
+    segments = getattr(file_path, "segments", None)
+    if segments is not None:
+        for segment_path in segments:
+            yield from iter_dataset_chunks(segment_path, chunk_rows, reader, columns, chunk_reader)
+        return
+    if chunk_reader is not None and file_path.suffix.lower() == ".csv":
+        yield from chunk_reader(file_path, chunk_rows, columns)
+        return
+    df = reader(file_path)
+    if columns is not None:
+        df = df[list(columns)]
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _normalize_keys(values, as_time: bool) -> np.ndarray:
+    if as_time:
+        keys = pd.to_datetime(values, errors="coerce")
+        if getattr(keys.dt, "tz", None) is not None:
+            keys = keys.dt.tz_convert("UTC").dt.tz_localize(None)
+        return keys.to_numpy(dtype="datetime64[ns]")
+    return np.asarray(values)
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray, order: np.ndarray, keep_unmatched: bool):
+    """Turn per-left-row (start, count) ranges into a permutation of the build side into row pairs.
+
+    Returns (left row index, right row index) with -1 for unmatched rows when keep_unmatched is set.
+    """
+    matched = counts > 0
+    if keep_unmatched:
+        emit = np.where(matched, counts, 1)
+    else:
+        emit = counts
+    total = int(emit.sum())
+    left_index = np.repeat(np.arange(len(counts)), emit)
+    offsets = np.arange(total) - np.repeat(np.cumsum(emit) - emit, emit)
+    positions = np.repeat(starts, emit) + offsets
+    right_index = np.where(np.repeat(matched, emit), order[np.clip(positions, 0, max(len(order) - 1, 0))], -1)
+    return left_index, right_index
+
+
+class BuildSide:
+    """A fully loaded join input, prepared once (sorted and/or hashed) and probed by every streamed chunk"""
+
+    def __init__(self, name: str, df, key: str, strategy: str, as_time: bool):
+        self.name = name
+        self.key = key
+        self.strategy = strategy
+        self.frame = df.reset_index(drop=True)
+        keys = _normalize_keys(self.frame[key], as_time)
+        valid = ~pd.isna(keys)
+        if not valid.all():
+            self.frame = self.frame.loc[valid].reset_index(drop=True)
+            keys = keys[valid]
+
+        if strategy == "hash":
+            codes, uniques = pd.factorize(keys, sort=False)
+            self.order = np.argsort(codes, kind="stable")
+            self.group_counts = np.bincount(codes, minlength=len(uniques))
+            self.group_starts = np.cumsum(self.group_counts) - self.group_counts
+            self.lookup = pd.Index(uniques)  # Hash table over distinct keys, built once
+        else:
+            # sort_merge and asof both probe a key-sorted build side
+            self.order = np.argsort(keys, kind="stable")
+            self.sorted_keys = keys[self.order]
+
+    def probe(self, left_keys: np.ndarray, tolerance=None):
+        """(start, count) ranges into self.order for every probe key"""
+        if self.strategy == "hash":
+            codes = self.lookup.get_indexer(left_keys)
+            found = codes >= 0
+            starts = np.where(found, self.group_starts[np.maximum(codes, 0)], 0)
+            counts = np.where(found, self.group_counts[np.maximum(codes, 0)], 0)
+            return starts, counts
+        if self.strategy == "sort_merge":
+            starts = np.searchsorted(self.sorted_keys, left_keys, side="left")
+            ends = np.searchsorted(self.sorted_keys, left_keys, side="right")
+            return starts, ends - starts
+        # asof: the last build row with key <= probe key (nearest earlier), optionally within tolerance
+        position = np.searchsorted(self.sorted_keys, left_keys, side="right") - 1
+        counts = (position >= 0).astype(np.int64)
+        if tolerance is not None and len(self.sorted_keys):
+            gap = left_keys - self.sorted_keys[np.maximum(position, 0)]
+            counts &= (gap <= tolerance)
+        counts[pd.isna(left_keys)] = 0
+        return np.maximum(position, 0), counts
+
+
+class LazyJoin:
+    """Join plan over several datasets; nothing is read until chunks are requested"""
+
+    def __init__(self, inputs: List[Dict[str, Any]], how: str = "inner", strategy: str = "auto",
+                 tolerance: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 reader: Optional[Callable[[Path], Any]] = None,
+                 chunk_reader: Optional[Callable[..., Iterator[Any]]] = None):
+        """inputs: [{"name", "path", "key", "columns"(optional)}], the first one is streamed.
+
+        Without reader/chunk_reader, files are parsed by a default ingest.ParserSelector.
+        """
+        if len(inputs) < 2:
+            raise ValueError("A join needs at least two datasets")
+        if how not in JOIN_TYPES:
+            raise ValueError(f"Unknown join type: {how}. Use one of {', '.join(JOIN_TYPES)}")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}. Use one of {', '.join(STRATEGIES)}")
+        self.inputs = inputs
+        self.how = how
+        self.requested_strategy = strategy
+        self.tolerance = pd.Timedelta(tolerance).to_timedelta64() if tolerance else None
+        self.chunk_rows = chunk_rows
+        if reader is None:
+            reader, chunk_reader = _default_parsers.read_frame, chunk_reader or _default_parsers.iter_frames
+        self.reader = reader
+        self.chunk_reader = chunk_reader
+        self.as_time: Optional[bool] = None
+        self.strategy: Optional[str] = None
+        self._build_sides: Optional[List[BuildSide]] = None
+
+    def _columns_for(self, spec: Dict[str, Any]) -> Optional[List[str]]:
+        columns = spec.get("columns")
+        if columns is None:
+            return None
+        return list(dict.fromkeys([spec["key"], *columns]))
+
+    def _prepare(self, first_chunk):
+        """Decide key type and strategy from the streamed side, then load and index the build sides"""
+        left_key = self.inputs[0]["key"]
+        if left_key not in first_chunk.columns:
+            raise ValueError(f"Key column '{left_key}' not found in {self.inputs[0]['name']}")
+        self.as_time = (pd.api.types.is_datetime64_any_dtype(first_chunk[left_key])
+                        or rollups.detect_timestamp_column(first_chunk[[left_key]]) == left_key)
+        strategy = self.requested_strategy
+        if strategy == "auto":
+            strategy = "asof" if self.as_time else "hash"
+        if strategy == "asof" and not (self.as_time or pd.api.types.is_numeric_dtype(first_chunk[left_key])):
+            raise ValueError("As-of joins need a timestamp or numeric key")
+        self.strategy = strategy
+
+        self._build_sides = []
+        for spec in self.inputs[1:]:
+            df = self.reader(spec["path"])
+            if spec["key"] not in df.columns:
+                raise ValueError(f"Key column '{spec['key']}' not found in {spec['name']}")
+            columns = self._columns_for(spec)
+            if columns is not None:
+                df = df[columns]
+            self._build_sides.append(BuildSide(spec["name"], df, spec["key"], strategy, self.as_time))
+
+    def iter_chunks(self) -> Iterator[Any]:
+        """Stream joined chunks; the streamed side is read incrementally"""
+        first = self.inputs[0]
+        chunks = iter_dataset_chunks(first["path"], self.chunk_rows, self.reader, self._columns_for(first),
+                                     self.chunk_reader)
+        for chunk in chunks:
+            if self._build_sides is None:
+                self._prepare(chunk)
+            joined = chunk.reset_index(drop=True)
+            for side in self._build_sides:
+                joined = self._join_chunk(joined, first["key"], side)
+                if joined.empty and self.how == "inner":
+                    break
+            if not joined.empty:
+                yield joined
+
+    def _join_chunk(self, left, left_key: str, side: BuildSide):
+        keys = _normalize_keys(left[left_key], self.as_time)
+        starts, counts = side.probe(keys, self.tolerance if self.strategy == "asof" else None)
+        left_index, right_index = _expand(starts, counts, side.order, self.how == "left")
+
+        result = left.iloc[left_index].reset_index(drop=True)
+        right = side.frame.iloc[np.maximum(right_index, 0)].reset_index(drop=True)
+        unmatched = right_index < 0
+        for column in side.frame.columns:
+            if column == side.key and self.strategy != "asof":
+                continue  # Equal to the left key for equality joins
+            target = column if column not in result.columns else f"{side.name}.{column}"
+            values = right[column]
+            if unmatched.any():
+                values = values.where(~unmatched)
+            result[target] = values.to_numpy()
+        return result
+
+    def head(self, rows: int):
+        """First `rows` joined rows, reading only as much of the streamed side as needed"""
+        parts, total = [], 0
+        for chunk in self.iter_chunks():
+            parts.append(chunk)
+            total += len(chunk)
+            if total >= rows:
+                break
+        return pd.concat(parts, ignore_index=True).head(rows) if parts else pd.DataFrame()
+
+    def materialize(self):
+        parts = list(self.iter_chunks())
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+_default_parsers = ingest.ParserSelector()  # Used when a join is planned without injected readers
+
+
+class JoinCache:
+    """LRU of materialized join results keyed by join spec and input versions"""
+
+    def __init__(self, max_entries: int = 8, max_result_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_result_bytes = max_result_bytes
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(spec: Dict[str, Any], versions: Sequence[str]) -> str:
+        payload = json.dumps({"spec": spec, "versions": list(versions)}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, df) -> bool:
+        if int(df.memory_usage(deep=True).sum()) > self.max_result_bytes:
+            return False
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def frame_to_records(df) -> List[Dict[str, Any]]:
+    """Row records for the response serializer, which writes timestamps as ISO strings and NaN/NaT as null"""
+    return df.to_dict(orient="records")
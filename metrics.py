@@ -0,0 +1,315 @@
+"""
+Lightweight in-process metrics for the Honeywell Terminal Manager backends
+Per-route latency histograms, in-flight gauges, payload sizes and named hot-path timers,
+rendered in the Prometheus text exposition format
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets (seconds) - fine resolution around typical API latencies so p99 can be estimated
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Payload size buckets (bytes) - 256B up to 256MB
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(11))
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed histogram with sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile from bucket counts (upper bucket bound, as Prometheus would)"""
+        series = self._series.get(self._key(labels))
+        if not series or series[2] == 0:
+            return None
+        target = q * series[2]
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[0]):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._series.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics of a process and renders them for scraping"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        """Register a callable returning extra exposition lines, evaluated at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- Standard Metrics ---
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method", "route"))
+REQUEST_SIZE = registry.histogram(
+    "http_request_size_bytes", "HTTP request body size by route", ("method", "route"), buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = registry.histogram(
+    "http_response_size_bytes", "HTTP response body size by route", ("method", "route"), buckets=SIZE_BUCKETS)
+OPERATION_LATENCY = registry.histogram(
+    "app_operation_duration_seconds", "Duration of named hot-path operations", ("operation",))
+EVENTS = registry.counter(
+    "app_events_total", "Named application events (cache hits, parsed rows, ...)", ("event",))
+
+
+@contextmanager
+def timer(operation: str):
+    """Time a block of code into app_operation_duration_seconds{operation=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        OPERATION_LATENCY.observe(time.perf_counter() - start, operation=operation)
+
+
+def timed(operation: str):
+    """Decorator form of timer() for sync and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timer(operation):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(event: str, amount: float = 1.0):
+    """Increment app_events_total{event=...}"""
+    EVENTS.inc(amount, event=event)
+
+
+def route_template(app, scope) -> str:
+    """Resolve the route path template (e.g. /api/datasets/{dataset_id}) to keep label cardinality bounded"""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    from starlette.routing import Match
+    partial = None
+    for candidate in getattr(app, "routes", []):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", scope.get("path", ""))
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(candidate, "path", None)
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, in-flight count and payload sizes per route"""
+
+    def __init__(self, app, router_app=None):
+        self.app = app
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        route = route_template(self.router_app, scope) if self.router_app is not None else scope.get("path", "")
+        status = {"code": 500}
+        response_bytes = 0
+
+        request_size = 0
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    request_size = int(value)
+                except ValueError:
+                    pass
+                break
+
+        async def send_wrapper(message):
+            nonlocal response_bytes
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(method=method, route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=method, route=route, status=status["code"])
+            REQUESTS_IN_FLIGHT.dec(method=method, route=route)
+            REQUEST_SIZE.observe(request_size, method=method, route=route)
+            RESPONSE_SIZE.observe(response_bytes, method=method, route=route)
+
+
+def install(app):
+    """Attach the metrics middleware and a /metrics scrape endpoint to a FastAPI app"""
+    from fastapi.responses import PlainTextResponse
+
+    app.add_middleware(MetricsMiddleware, router_app=app)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """Prometheus scrape endpoint"""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+    return app
@@ -0,0 +1,342 @@
+"""
+Opt-in per-request profiling for the Honeywell Terminal Manager backends
+A single request can be run under cProfile or a stack sampler by sending `X-Profile: cprofile|sample`
+(or `?profile=cprofile|sample`) while profiling is enabled. Results are stored and served from /api/profiles.
+
+The profiled request's coroutine is captured while it runs on the event loop (not the other requests interleaved
+with it), along with the work it hands to the thread pool through this module's run_in_threadpool. On Python 3.12+
+cProfile is interpreter-wide (sys.monitoring): a profile also records whatever other threads run while it is active,
+and only one can be active at a time, so the parts of a request that overlap another profiled one go unrecorded.
+"""
+
+import cProfile
+import contextvars
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool as _starlette_run_in_threadpool
+
+PROFILE_MODES = ("cprofile", "sample")
+TRUTHY = ("1", "true", "yes")
+
+
+class StackSampler:
+    """Samples the stacks of a changing set of threads ({thread id: label}) at a fixed interval and aggregates
+    collapsed stacks (flamegraph.pl format), each rooted at its thread's label"""
+
+    def __init__(self, threads: Dict[int, str], interval: float = 0.005):
+        self.threads = threads
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, label in list(self.threads.items()):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                names.append(label)
+                self.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestCapture:
+    """Profile of one request: its coroutine's steps on the event loop plus its thread pool calls"""
+
+    def __init__(self, mode: str, sample_interval: float = 0.005):
+        self.mode = mode
+        self.loop_thread = threading.get_ident()
+        self.threads: Dict[int, str] = {}  # Threads currently working for this request -> stack root label
+        self.profiles: List[cProfile.Profile] = []
+        self.loop_profile = cProfile.Profile() if mode == "cprofile" else None
+        self.sampler = StackSampler(self.threads, sample_interval) if mode == "sample" else None
+        self._lock = threading.Lock()
+
+    def resume(self):
+        """The request's coroutine is about to run a step on the event loop"""
+        if self.loop_profile is not None:
+            try:
+                self.loop_profile.enable()
+            except ValueError:  # Another profiler already owns this interpreter (Python 3.12+ sys.monitoring)
+                pass
+        else:
+            self.threads[self.loop_thread] = "event-loop"
+
+    def suspend(self):
+        if self.loop_profile is not None:
+            self.loop_profile.disable()
+        else:
+            self.threads.pop(self.loop_thread, None)
+
+    def run(self, func: Callable, *args, **kwargs):
+        """Call func in the current (worker) thread, profiled as part of this request"""
+        ident = threading.get_ident()
+        if self.mode != "cprofile":
+            self.threads[ident] = "worker-thread"
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.threads.pop(ident, None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler already owns this interpreter (Python 3.12+ sys.monitoring)
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self.profiles.append(profile)
+
+    def start(self):
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def finish(self) -> Tuple[str, bytes]:
+        """(file suffix, content) of the finished capture"""
+        if self.sampler is not None:
+            self.sampler.stop()
+            return ".folded", self.sampler.collapsed().encode()
+        stats = pstats.Stats()
+        with self._lock:
+            for profile in [self.loop_profile] + self.profiles:
+                try:
+                    stats.add(profile)
+                except TypeError:  # Recorded nothing, e.g. another profiler was active throughout
+                    pass
+        return ".prof", marshal.dumps(stats.stats)
+
+
+class _Stepped:
+    """Awaitable driving a coroutine step by step, with capture.resume()/suspend() around every step it runs on
+    the event loop, so work of other requests interleaved on the loop is not attributed to it"""
+
+    def __init__(self, coro, capture: RequestCapture):
+        self.coro = coro
+        self.capture = capture
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            self.capture.resume()
+            try:
+                yielded = self.coro.throw(error) if error is not None else self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.capture.suspend()
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+
+_current_capture: "contextvars.ContextVar[Optional[RequestCapture]]" = contextvars.ContextVar(
+    "request_capture", default=None)
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs) -> Any:
+    """Starlette's run_in_threadpool; inside a profiled request the worker thread is profiled with it"""
+    capture = _current_capture.get()
+    if capture is None:
+        return await _starlette_run_in_threadpool(func, *args, **kwargs)
+    return await _starlette_run_in_threadpool(capture.run, func, *args, **kwargs)
+
+
+class RequestProfiler:
+    """Profiling configuration, rate limiting and result storage"""
+
+    def __init__(self, enabled: bool = False, output_dir: str = "./profiles", max_per_minute: int = 6,
+                 sample_interval: float = 0.005, token: Optional[str] = None, keep: int = 50):
+        self.enabled = enabled
+        self.output_dir = Path(output_dir)
+        self.max_per_minute = max_per_minute
+        self.sample_interval = sample_interval
+        self.token = token
+        self.keep = keep
+        self._recent: Deque[float] = deque()
+        self._active = False
+        self._lock = threading.Lock()
+
+    def requested_mode(self, scope) -> Optional[str]:
+        """Return the requested profile mode for this request, or None"""
+        value = None
+        for name, raw in scope.get("headers", []):
+            if name == b"x-profile":
+                value = raw.decode("latin-1").strip().lower()
+                break
+        if value is None and b"profile=" in scope.get("query_string", b""):
+            values = parse_qs(scope["query_string"].decode("latin-1")).get("profile")
+            value = values[0].strip().lower() if values else None
+        if not value:
+            return None
+        if self.token:
+            # With a token configured the trigger is `<mode>:<token>` (or just `<token>` for cProfile)
+            mode, _, token = value.rpartition(":") if ":" in value else ("cprofile", "", value)
+            if token != self.token.lower():
+                return None
+            value = mode
+        if value in TRUTHY:
+            return "cprofile"
+        return value if value in PROFILE_MODES else None
+
+    def acquire(self) -> Optional[str]:
+        """Reserve a profiling slot; returns a reason string when the request must run unprofiled"""
+        now = time.monotonic()
+        with self._lock:
+            if self._active:
+                return "busy"
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.max_per_minute:
+                return "rate-limited"
+            self._recent.append(now)
+            self._active = True
+        return None
+
+    def release(self):
+        with self._lock:
+            self._active = False
+
+    def save(self, profile_id: str, suffix: str, content: bytes):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        (self.output_dir / f"{profile_id}{suffix}").write_bytes(content)
+        self._prune()
+
+    def _prune(self):
+        files = sorted(self.output_dir.glob("*"), key=lambda p: p.stat().st_mtime)
+        for stale in files[:-self.keep * 2]:
+            stale.unlink(missing_ok=True)
+
+    def list_profiles(self) -> List[Dict[str, object]]:
+        if not self.output_dir.exists():
+            return []
+        profiles = []
+        for path in sorted(self.output_dir.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True):
+            if path.suffix in (".prof", ".folded"):
+                profiles.append({
+                    "id": path.stem,
+                    "mode": "cprofile" if path.suffix == ".prof" else "sample",
+                    "file_size": path.stat().st_size,
+                    "created": path.stat().st_mtime,
+                })
+        return profiles
+
+    def find(self, profile_id: str) -> Optional[Path]:
+        for suffix in (".prof", ".folded"):
+            path = self.output_dir / f"{profile_id}{suffix}"
+            if path.exists() and path.parent == self.output_dir:
+                return path
+        return None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; requests without a profile trigger pass straight through"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = self.profiler.requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        refused = self.profiler.acquire()
+        if refused:
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile-status", refused.encode())]))
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        headers = [(b"x-profile-status", b"captured"), (b"x-profile-id", profile_id.encode()),
+                   (b"x-profile-url", f"/api/profiles/{profile_id}".encode())]
+        capture = RequestCapture(mode, self.profiler.sample_interval)
+        token = _current_capture.set(capture)
+        capture.start()
+        try:
+            await _Stepped(self.app(scope, receive, self._with_headers(send, headers)), capture)
+        finally:
+            _current_capture.reset(token)
+            try:
+                self.profiler.save(profile_id, *capture.finish())
+            finally:
+                self.profiler.release()
+
+    @staticmethod
+    def _with_headers(send, headers):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+        return send_wrapper
+
+
+def stats_summary(path: Path, limit: int = 40, sort: str = "cumulative") -> str:
+    """Human-readable pstats report for a stored .prof file"""
+    buffer = io.StringIO()
+    stats = pstats.Stats(str(path), stream=buffer)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return buffer.getvalue()
+
+
+def install(app, profiler: RequestProfiler):
+    """Attach the profiling middleware and the /api/profiles endpoints to a FastAPI app"""
+    from fastapi import HTTPException
+    from fastapi.responses import FileResponse, PlainTextResponse
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    if not profiler.enabled:
+        return app
+
+    @app.get("/api/profiles")
+    async def list_profiles():
+        """List captured request profiles"""
+        return {"profiles": profiler.list_profiles()}
+
+    @app.get("/api/profiles/{profile_id}")
+    async def get_profile(profile_id: str, format: str = "raw", sort: str = "cumulative"):
+        """Download a profile (.prof pstats or .folded collapsed stacks); format=text for a pstats report"""
+        path = profiler.find(profile_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        if format == "text" and path.suffix == ".prof":
+            return PlainTextResponse(stats_summary(path, sort=sort))
+        return FileResponse(path, filename=path.name, media_type="application/octet-stream")
+
+    return app
@@ -0,0 +1,218 @@
+"""
+Response layer for the Honeywell Terminal Manager backends
+Fast JSON serialization (orjson when installed, with native numpy/datetime support), negotiated
+brotli/gzip compression above a size threshold, and an optional Arrow IPC format for tabular payloads
+"""
+
+import json
+import math
+import zlib
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse, Response
+
+# Optional fast serializer
+ORJSON_AVAILABLE = False
+try:
+    import orjson  # type: ignore
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+
+# Optional brotli compression
+BROTLI_AVAILABLE = False
+try:
+    import brotli  # type: ignore
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+
+# Optional Arrow IPC output
+ARROW_AVAILABLE = False
+try:
+    import pyarrow as pa  # type: ignore
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Already-compressed or streaming-sensitive content is passed through untouched
+SKIP_COMPRESSION_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip",
+                          "application/x-gzip", "text/event-stream", "application/vnd.apache.parquet")
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for types neither orjson nor json handle natively"""
+    if obj is None or type(obj).__name__ in ("NAType", "NaTType"):
+        return None
+    if hasattr(obj, "model_dump"):  # pydantic v2 models
+        return obj.model_dump()
+    if hasattr(obj, "isoformat"):  # pandas Timestamp, datetime subclasses
+        return obj.isoformat()
+    if getattr(obj, "ndim", None) == 0 and hasattr(obj, "item"):  # numpy scalars
+        return _sanitize(obj.item())
+    if hasattr(obj, "tolist"):  # numpy arrays, pandas Index/Series
+        return _sanitize(obj.tolist())
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _sanitize(obj: Any) -> Any:
+    """Stdlib fallback: replace NaN/inf with null like orjson does"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(v) for v in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_sanitize(content), default=_default, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (numpy arrays/scalars, datetimes and pydantic models supported)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def wants_arrow(request, format: Optional[str] = None) -> bool:
+    if format:
+        return format.lower() == "arrow"
+    return ARROW_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def arrow_response(table_like: Any, metadata: Optional[dict] = None) -> Response:
+    """Serialize a DataFrame or list of records as an Arrow IPC stream"""
+    if not ARROW_AVAILABLE:
+        return FastJSONResponse({"detail": "Arrow output requires pyarrow"}, status_code=406)
+    if hasattr(table_like, "columns") and hasattr(table_like, "dtypes"):
+        table = pa.Table.from_pandas(table_like, preserve_index=False)
+    else:
+        table = pa.Table.from_pylist(list(table_like))
+    if metadata:
+        table = table.replace_schema_metadata({k: json.dumps(v, default=_default) for k, v in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    offered = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[token.strip().lower()] = quality
+    wildcard = offered.get("*", 0.0)
+    for encoding in (("br",) if BROTLI_AVAILABLE else ()) + ("gzip",):
+        if offered.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._impl = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._impl.process(data)
+            return out + (self._impl.finish() if final else self._impl.flush())
+        out = self._impl.compress(data)
+        return out + self._impl.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses above min_size with the best encoding the client accepts.
+
+    Streaming responses are compressed chunk by chunk and flushed, so the client still receives bytes immediately.
+    """
+
+    def __init__(self, app, min_size: int = 1024, level: int = 5):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or content_type.startswith(SKIP_COMPRESSION_TYPES):
+                    state["passthrough"] = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if state["compressor"] is None:
+                if not more_body and len(body) < self.min_size:
+                    await send(state["start"])
+                    await send(message)
+                    state["passthrough"] = True
+                    return
+                state["compressor"] = _Compressor(encoding, self.level)
+                start = state["start"]
+                headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+                headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                if not more_body:
+                    compressed = state["compressor"].compress(body, final=True)
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed, "more_body": False})
+                    return
+                await send({**start, "headers": headers})
+            compressed = state["compressor"].compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def install(app, min_size: int = 1024, level: int = 5):
+    """Attach response compression to a FastAPI app"""
+    app.add_middleware(CompressionMiddleware, min_size=min_size, level=level)
+    return app
@@ -0,0 +1,200 @@
+"""
+Retrieval of dataset context for chat prompts
+Each dataset is indexed as short text snippets (a summary plus one line per column with its statistics) in an
+incremental BM25 index. At chat time only the best-matching snippets that fit a token budget go into the prompt, so
+prompt size and generation time stay flat as the number of datasets grows.
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pandas as pd  # type: ignore
+except ImportError:  # Without pandas only the profile-based snippets are indexed
+    pd = None
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do for from has have how i in is it me my of on or show tell that the this to was
+what when where which who why with you your about please give
+""".split())
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+(?:\.\d+)?")
+CAMEL_BOUNDARY = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word and number tokens; snake_case and camelCase identifiers are split into their words"""
+    text = CAMEL_BOUNDARY.sub(" ", str(text)).replace("_", " ")
+    return [t for t in (m.group(0).lower() for m in TOKEN_PATTERN.finditer(text)) if t not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def _format_number(value: Any) -> str:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if math.isnan(value):
+        return "n/a"
+    return f"{value:.0f}" if value.is_integer() else f"{value:.4g}"
+
+
+def dataset_snippets(info: Dict[str, Any], df=None, time_column: Optional[str] = None) -> List[str]:
+    """Text snippets describing one dataset: a summary line and one line per column.
+
+    `info` is a DatasetInfo dict; `df`, when given, adds numeric statistics and the covered time range.
+    """
+    columns = info.get("columns", [])
+    summary = (f"Dataset {info['name']} ({info.get('operation_type', 'unknown')} operations): "
+               f"{info.get('row_count', 0)} rows, {info.get('column_count', len(columns))} columns: "
+               f"{', '.join(str(c['name']) for c in columns)}.")
+    if df is not None and time_column is not None and pd is not None:
+        timestamps = pd.to_datetime(df[time_column], errors="coerce")
+        if timestamps.notna().any():
+            summary += f" Covers {timestamps.min()} to {timestamps.max()}."
+    snippets = [summary]
+
+    numeric = set()
+    if df is not None and pd is not None:
+        numeric = {c for c in df.columns
+                   if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])}
+    for column in columns:
+        name = column["name"]
+        text = f"{info['name']} column {name} ({column.get('type', 'string')})"
+        if name in numeric:
+            values = df[name]
+            text += (f": min {_format_number(values.min())}, mean {_format_number(values.mean())}, "
+                     f"max {_format_number(values.max())}")
+        else:
+            samples = [str(v) for v in column.get("sample_values", [])[:3]]
+            text += f": {column.get('unique_count', 0)} distinct values"
+            if samples:
+                text += f" such as {', '.join(samples)}"
+        if column.get("null_count"):
+            text += f"; {column['null_count']} missing"
+        snippets.append(text + ".")
+    return snippets
+
+
+class BM25Index:
+    """Okapi BM25 over snippets grouped by dataset; datasets can be added, replaced and removed incrementally"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # term -> snippet id -> term frequency
+        self._snippets: Dict[int, Tuple[str, str, int]] = {}  # snippet id -> (dataset, text, length)
+        self._datasets: Dict[str, Tuple[str, List[int], Optional[str]]] = {}  # name -> (version, ids, operation type)
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    def version(self, dataset: str) -> Optional[str]:
+        entry = self._datasets.get(dataset)
+        return entry[0] if entry is not None else None
+
+    def add_dataset(self, dataset: str, version: str, snippets: Iterable[str], operation_type: Optional[str] = None):
+        """Index (or re-index) a dataset's snippets; a no-op when this version is already indexed"""
+        with self._lock:
+            if dataset in self._datasets and self._datasets[dataset][0] == version:
+                return
+            self._remove(dataset)
+            ids = []
+            for text in snippets:
+                terms = Counter(tokenize(text))
+                snippet_id = self._next_id
+                self._next_id += 1
+                length = sum(terms.values())
+                self._snippets[snippet_id] = (dataset, text, length)
+                self._total_length += length
+                for term, tf in terms.items():
+                    self._postings[term][snippet_id] = tf
+                ids.append(snippet_id)
+            self._datasets[dataset] = (version, ids, operation_type)
+
+    def remove_dataset(self, dataset: str):
+        with self._lock:
+            self._remove(dataset)
+
+    def _remove(self, dataset: str):
+        entry = self._datasets.pop(dataset, None)
+        if entry is None:
+            return
+        for snippet_id in entry[1]:
+            _, text, length = self._snippets.pop(snippet_id)
+            self._total_length -= length
+            for term in set(tokenize(text)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(snippet_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def search(self, query: str, k: int = 10, operation_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top-k snippets by BM25 score; only postings of the query terms are visited"""
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._snippets)
+            if not count or not terms:
+                return []
+            average_length = self._total_length / count
+            allowed = None
+            if operation_type is not None:
+                allowed = {name for name, entry in self._datasets.items() if entry[2] in (None, operation_type)}
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for snippet_id, tf in postings.items():
+                    length = self._snippets[snippet_id][2]
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[snippet_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for snippet_id, score in ranked:
+                dataset, text, _ = self._snippets[snippet_id]
+                if allowed is not None and dataset not in allowed:
+                    continue
+                results.append({"dataset": dataset, "text": text, "score": round(score, 4)})
+                if len(results) >= k:
+                    break
+            return results
+
+    def select_context(self, query: str, token_budget: int, k: int = 8,
+                       operation_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Best-scoring snippets that fit in token_budget, in rank order"""
+        selected, used = [], 0
+        for hit in self.search(query, k=k * 3, operation_type=operation_type):
+            tokens = estimate_tokens(hit["text"])
+            if used + tokens > token_budget:
+                continue
+            selected.append({**hit, "tokens": tokens})
+            used += tokens
+            if len(selected) >= k:
+                break
+        return selected
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"datasets": len(self._datasets), "snippets": len(self._snippets), "terms": len(self._postings)}
+
+
+def build_prompt(message: str, snippets: List[Dict[str, Any]], operation_type: str) -> str:
+    """Prompt for the chat model: retrieved dataset facts, then the user's question"""
+    lines = [f"You are an assistant for {operation_type} operations. Answer using the dataset facts below."]
+    if snippets:
+        lines.append("Dataset facts:")
+        lines.extend(f"- {s['text']}" for s in snippets)
+    lines.append(f"Question: {message}")
+    return "\n".join(lines)
@@ -0,0 +1,326 @@
+"""
+Pre-materialized time-series rollups for uploaded datasets
+At ingest, numeric columns are aggregated into minute/hour/day buckets (count, sum, min, max, mean, last)
+so chart and KPI endpoints scale with the number of buckets instead of the number of raw rows
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import pandas as pd  # type: ignore
+except ImportError:  # Rollups are only built when pandas is available
+    pd = None
+
+# Stored resolutions, finest first: name -> (pandas frequency, bucket seconds)
+RESOLUTIONS: "OrderedDict[str, Tuple[str, int]]" = OrderedDict([
+    ("minute", ("min", 60)),
+    ("hour", ("h", 3600)),
+    ("day", ("D", 86400)),
+])
+AGGREGATES = ("count", "sum", "min", "max", "mean", "last")
+TIMESTAMP_HINTS = ("timestamp", "datetime", "time", "date", "ts")
+DEFAULT_MAX_POINTS = 500
+
+
+def detect_timestamp_column(df) -> Optional[str]:
+    """Find the column holding event timestamps: datetime dtype first, then name hints verified by parsing"""
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            return col
+
+    def hint_rank(col) -> int:
+        name = str(col).lower()
+        for rank, hint in enumerate(TIMESTAMP_HINTS):
+            if name == hint or name.endswith(f"_{hint}") or name.startswith(f"{hint}_") or hint in name:
+                return rank
+        return len(TIMESTAMP_HINTS)
+
+    candidates = sorted((c for c in df.columns if hint_rank(c) < len(TIMESTAMP_HINTS)), key=hint_rank)
+    # Unnamed string columns may still hold timestamps; check them after the hinted ones
+    candidates += [c for c in df.columns if c not in candidates and df[c].dtype == object]
+    for col in candidates:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        sample = df[col].dropna().head(200)
+        if sample.empty:
+            continue
+        parsed = pd.to_datetime(sample, errors="coerce")
+        if parsed.notna().mean() >= 0.9:
+            return col
+    return None
+
+
+def parse_resolution(resolution: Optional[str]) -> Optional[int]:
+    """Resolution name ("hour") or pandas offset ("15min", "6h") -> bucket seconds"""
+    if not resolution:
+        return None
+    if resolution in RESOLUTIONS:
+        return RESOLUTIONS[resolution][1]
+    return int(pd.Timedelta(pd.tseries.frequencies.to_offset(resolution)).total_seconds())
+
+
+def level_for_span(span_seconds: float, max_points: int = DEFAULT_MAX_POINTS) -> str:
+    """Finest stored resolution that covers span_seconds in at most max_points buckets"""
+    names = list(RESOLUTIONS)
+    return next((n for n in names if span_seconds / RESOLUTIONS[n][1] <= max_points), names[-1])
+
+
+def _aggregate(buckets, frame, numeric_columns: List[str]):
+    """Aggregate raw values grouped by bucket into the flat `<column>__<aggregate>` layout"""
+    grouped = frame.groupby(buckets, sort=True)
+    parts = {}
+    for col in numeric_columns:
+        series = grouped[col]
+        parts[f"{col}__count"] = series.count()
+        parts[f"{col}__sum"] = series.sum()
+        parts[f"{col}__min"] = series.min()
+        parts[f"{col}__max"] = series.max()
+        parts[f"{col}__last"] = series.last()
+    result = pd.DataFrame(parts)
+    for col in numeric_columns:
+        result[f"{col}__mean"] = result[f"{col}__sum"] / result[f"{col}__count"].where(result[f"{col}__count"] > 0)
+    result.index.name = "bucket"
+    return result
+
+
+def _reaggregate(rollup, freq: str, numeric_columns: List[str]):
+    """Combine finer rollup buckets into coarser ones without touching raw rows"""
+    grouped = rollup.groupby(rollup.index.floor(freq), sort=True)
+    parts = {}
+    for col in numeric_columns:
+        parts[f"{col}__count"] = grouped[f"{col}__count"].sum()
+        parts[f"{col}__sum"] = grouped[f"{col}__sum"].sum(min_count=1)
+        parts[f"{col}__min"] = grouped[f"{col}__min"].min()
+        parts[f"{col}__max"] = grouped[f"{col}__max"].max()
+        parts[f"{col}__last"] = grouped[f"{col}__last"].last()
+    result = pd.DataFrame(parts)
+    for col in numeric_columns:
+        result[f"{col}__mean"] = result[f"{col}__sum"] / result[f"{col}__count"].where(result[f"{col}__count"] > 0)
+    result.index.name = "bucket"
+    return result
+
+
+def build_rollups(df, timestamp_column: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Materialize every stored resolution; returns None when there is no usable timestamp or numeric data"""
+    if pd is None:
+        return None
+    timestamp_column = timestamp_column or detect_timestamp_column(df)
+    if timestamp_column is None:
+        return None
+    numeric_columns = [c for c in df.columns
+                       if c != timestamp_column and pd.api.types.is_numeric_dtype(df[c])
+                       and not pd.api.types.is_bool_dtype(df[c])]
+    if not numeric_columns:
+        return None
+
+    timestamps = pd.to_datetime(df[timestamp_column], errors="coerce")
+    if getattr(timestamps.dt, "tz", None) is not None:
+        timestamps = timestamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    valid = timestamps.notna()
+    frame = df.loc[valid, numeric_columns].astype("float64")
+    timestamps = timestamps[valid]
+    if frame.empty:
+        return None
+
+    # Sort once so `last` means latest in time; coarser levels derive from the finest one
+    order = timestamps.argsort(kind="stable")
+    frame = frame.iloc[order]
+    timestamps = timestamps.iloc[order]
+
+    levels = {}
+    finest = None
+    for name, (freq, _) in RESOLUTIONS.items():
+        if finest is None:
+            finest = _aggregate(timestamps.dt.floor(freq).values, frame, numeric_columns)
+            levels[name] = finest
+        else:
+            levels[name] = _reaggregate(finest, freq, numeric_columns)
+
+    return {
+        "timestamp_column": str(timestamp_column),
+        "numeric_columns": [str(c) for c in numeric_columns],
+        "start": timestamps.iloc[0].isoformat(),
+        "end": timestamps.iloc[-1].isoformat(),
+        "row_count": int(len(frame)),
+        "levels": levels,
+    }
+
+
+class RollupStore:
+    """On-disk rollup store: <root>/<dataset file name>/<resolution>.pkl plus meta.json"""
+
+    def __init__(self, root: Path, memory_entries: int = 64):
+        self.root = Path(root)
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self._meta: Dict[str, Dict[str, Any]] = {}  # dataset name -> meta.json contents
+        self._lock = threading.Lock()
+
+    def _dir(self, dataset_name: str) -> Path:
+        return self.root / dataset_name
+
+    @staticmethod
+    def source_version(file_path: Path) -> str:
+        stats = file_path.stat()
+        return f"{stats.st_mtime_ns}-{stats.st_size}"
+
+    def meta(self, dataset_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if dataset_name in self._meta:
+                return self._meta[dataset_name]
+        try:
+            with open(self._dir(dataset_name) / "meta.json") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._meta[dataset_name] = meta
+        return meta
+
+    def is_fresh(self, file_path: Path) -> bool:
+        meta = self.meta(file_path.name)
+        return meta is not None and meta.get("source_version") == self.source_version(file_path)
+
+    def materialize(self, file_path: Path, df) -> Optional[Dict[str, Any]]:
+        """Build and persist rollups for a freshly ingested file; returns the stored metadata"""
+        built = build_rollups(df)
+        target = self._dir(file_path.name)
+        if built is None:
+            self.drop(file_path.name)
+            return None
+        target.mkdir(parents=True, exist_ok=True)
+        levels = built.pop("levels")
+        for name, rollup in levels.items():
+            tmp_path = target / f"{name}.pkl.tmp"
+            rollup.to_pickle(tmp_path)
+            tmp_path.replace(target / f"{name}.pkl")
+        meta = {
+            **built,
+            "source_version": self.source_version(file_path),
+            "bucket_counts": {name: int(len(rollup)) for name, rollup in levels.items()},
+        }
+        tmp_meta = target / "meta.json.tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        tmp_meta.replace(target / "meta.json")
+        with self._lock:
+            self._meta[file_path.name] = meta
+            for key in [k for k in self._memory if k[0] == file_path.name]:
+                del self._memory[key]
+        return meta
+
+    def drop(self, dataset_name: str):
+        target = self._dir(dataset_name)
+        if target.exists():
+            for path in target.iterdir():
+                path.unlink()
+            target.rmdir()
+        with self._lock:
+            self._meta.pop(dataset_name, None)
+            for key in [k for k in self._memory if k[0] == dataset_name]:
+                del self._memory[key]
+
+    def load(self, dataset_name: str, resolution: str):
+        meta = self.meta(dataset_name)
+        if meta is None:
+            return None
+        key = (dataset_name, resolution, meta["source_version"])
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        try:
+            rollup = pd.read_pickle(self._dir(dataset_name) / f"{resolution}.pkl")
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[key] = rollup
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return rollup
+
+    def common_level(self, dataset_names: List[str], start: Optional[str] = None, end: Optional[str] = None,
+                     max_points: int = DEFAULT_MAX_POINTS) -> Optional[str]:
+        """One resolution for several datasets, chosen from their combined span (or the requested range), so
+        their buckets line up when merged"""
+        metas = [m for m in (self.meta(name) for name in dataset_names) if m is not None]
+        if not metas:
+            return None
+        range_start = pd.Timestamp(start) if start else min(pd.Timestamp(m["start"]) for m in metas)
+        range_end = pd.Timestamp(end) if end else max(pd.Timestamp(m["end"]) for m in metas)
+        return level_for_span(max((range_end - range_start).total_seconds(), 0), max_points)
+
+    def query(self, dataset_name: str, start: Optional[str] = None, end: Optional[str] = None,
+              resolution: Optional[str] = None, max_points: int = DEFAULT_MAX_POINTS) -> Optional[Tuple[str, Any]]:
+        """Read the coarsest stored rollup satisfying the range and resolution.
+
+        With an explicit resolution the coarsest level at least that fine is used (and re-aggregated up to the
+        requested bucket when it is not a stored one). Without one, the finest level that fits in max_points
+        buckets over the range is chosen.
+        """
+        meta = self.meta(dataset_name)
+        if meta is None:
+            return None
+        range_start = pd.Timestamp(start) if start else pd.Timestamp(meta["start"])
+        range_end = pd.Timestamp(end) if end else pd.Timestamp(meta["end"])
+        span_seconds = max((range_end - range_start).total_seconds(), 0)
+
+        requested = parse_resolution(resolution)
+        names = list(RESOLUTIONS)
+        if requested is not None:
+            usable = [n for n in names if RESOLUTIONS[n][1] <= requested]
+            level = usable[-1] if usable else names[0]
+        else:
+            level = level_for_span(span_seconds, max_points)
+
+        rollup = self.load(dataset_name, level)
+        if rollup is None:
+            return None
+        rollup = rollup.loc[(rollup.index >= range_start.floor(RESOLUTIONS[level][0])) & (rollup.index <= range_end)]
+        if requested is not None and requested > RESOLUTIONS[level][1]:
+            rollup = _reaggregate(rollup, f"{requested}s", meta["numeric_columns"])
+            level = resolution
+        return level, rollup
+
+
+def combine_mean(rollups: List[Any], column: str) -> Optional[float]:
+    """Mean of a column over whole rollups (sum of sums / sum of counts)"""
+    total, count = 0.0, 0.0
+    for rollup in rollups:
+        if f"{column}__sum" in rollup:
+            total += float(rollup[f"{column}__sum"].sum())
+            count += float(rollup[f"{column}__count"].sum())
+    return total / count if count else None
+
+
+def combine_sum(rollups: List[Any], column: str) -> Optional[float]:
+    sums = [float(r[f"{column}__sum"].sum()) for r in rollups if f"{column}__sum" in r]
+    return sum(sums) if sums else None
+
+
+def combine_last(rollups: List[Any], column: str) -> Optional[float]:
+    latest = None
+    for rollup in rollups:
+        if f"{column}__last" in rollup:
+            values = rollup[f"{column}__last"].dropna()
+            if not values.empty and (latest is None or values.index[-1] > latest[0]):
+                latest = (values.index[-1], float(values.iloc[-1]))
+    return latest[1] if latest else None
+
+
+def combine_window_sum(rollups: List[Any], column: str, window_seconds: float) -> Optional[float]:
+    """Sum of a column over the buckets within window_seconds of the latest bucket holding a value"""
+    latest = None
+    for rollup in rollups:
+        if f"{column}__count" in rollup:
+            filled = rollup.index[rollup[f"{column}__count"] > 0]
+            if len(filled) and (latest is None or filled[-1] > latest):
+                latest = filled[-1]
+    if latest is None:
+        return None
+    cutoff = latest - pd.Timedelta(seconds=window_seconds)
+    return sum(float(r.loc[r.index > cutoff, f"{column}__sum"].sum()) for r in rollups if f"{column}__sum" in r)
@@ -0,0 +1,322 @@
+"""
+Row samples for approximate interactive queries
+Every dataset version gets a uniform sample and a sample stratified by time bucket and key categorical columns, in
+which every stratum is represented and small strata are kept whole. Group-by counts, sums and means are estimated
+from a sample with its design weights, and their confidence intervals come from the stratified variance estimator,
+so dashboards can be answered in milliseconds and recomputed exactly on demand.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import rollups
+
+KINDS = ("uniform", "stratified")
+AGGREGATES = ("count", "sum", "mean")
+STRATUM_COLUMN = "__stratum"
+TIME_COLUMN = "__timestamp"  # Parsed (naive UTC) timestamps stored with every sample, used for time filters
+TIME_BUCKETS = (("day", "datetime64[D]"), ("week", "datetime64[W]"), ("month", "datetime64[M]"))
+MIN_STRATUM_ROWS = 20  # Sample rows per stratum aimed for when choosing how finely to stratify
+MAX_KEY_COLUMNS = 2
+MAX_KEY_DISTINCT = 50  # Categorical columns with more distinct values are not used as strata keys
+
+
+def timestamps(df, column: Optional[str]):
+    """Naive (UTC) timestamps of a column, NaT where unparseable or when there is no timestamp column"""
+    if column is None or column not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    values = pd.to_datetime(df[column], errors="coerce")
+    if getattr(values.dt, "tz", None) is not None:
+        values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+    return values
+
+
+def key_columns(df, exclude: Sequence[Any] = ()) -> List[str]:
+    """Low-cardinality categorical columns used as strata keys, in column order"""
+    keys = []
+    for col in df.columns:
+        series = df[col]
+        if (col in exclude or pd.api.types.is_datetime64_any_dtype(series)
+                or (pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series))):
+            continue
+        if series.head(10_000).nunique() > MAX_KEY_DISTINCT:
+            continue  # Cheap rejection of identifiers and free text
+        if 2 <= series.nunique() <= MAX_KEY_DISTINCT:
+            keys.append(col)
+            if len(keys) == MAX_KEY_COLUMNS:
+                break
+    return keys
+
+
+def _codes(parts: List[Any], rows: int) -> np.ndarray:
+    """Dense group code per row for the combination of several key arrays (missing values form their own group)"""
+    codes = np.zeros(rows, dtype=np.int64)
+    for part in parts:
+        part_codes, uniques = pd.factorize(part, use_na_sentinel=False)
+        codes = codes * max(len(uniques), 1) + part_codes
+    return pd.factorize(codes)[0]
+
+
+def stratify(df, budget: int, timestamp_column: Optional[str] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Stratum code per row: time bucket x key columns, as fine as MIN_STRATUM_ROWS rows per stratum allow"""
+    keys = key_columns(df, [timestamp_column])
+    times = timestamps(df, timestamp_column).to_numpy() if timestamp_column is not None else None
+    buckets = TIME_BUCKETS if times is not None else ((None, None),)
+    max_strata = max(budget // MIN_STRATUM_ROWS, 1)
+    for count in range(len(keys), -1, -1):
+        for name, unit in buckets:
+            parts = [df[col] for col in keys[:count]]
+            if unit is not None:
+                parts.insert(0, times.astype(unit))
+            codes = _codes(parts, len(df))
+            if codes.max(initial=0) < max_strata:
+                return codes, {"time_bucket": name, "keys": [str(col) for col in keys[:count]]}
+    return np.zeros(len(df), dtype=np.int64), {"time_bucket": None, "keys": []}
+
+
+def allocate(sizes: np.ndarray, budget: int) -> np.ndarray:
+    """Sample rows per stratum: equal shares capped at each stratum's size, so small strata are taken whole"""
+    sizes = np.asarray(sizes, dtype=np.int64)
+    if sizes.sum() <= budget:
+        return sizes.copy()
+    ordered = np.sort(sizes)
+    taken = 0
+    for k, size in enumerate(ordered):
+        cap = (budget - taken) / (len(ordered) - k)
+        if size >= cap:
+            break
+        taken += size
+    return np.minimum(sizes, max(int(cap), 1))
+
+
+def _draw(codes: np.ndarray, allocation: np.ndarray, rng) -> np.ndarray:
+    """Sorted row positions of allocation[h] rows per stratum h, drawn without replacement"""
+    order = np.argsort(codes + rng.random(len(codes)))  # By stratum, random within it (one float sort key)
+    sorted_codes = codes[order]
+    starts = np.searchsorted(sorted_codes, np.arange(len(allocation)))
+    rank = np.arange(len(codes)) - starts[sorted_codes]
+    return np.sort(order[rank < allocation[sorted_codes]])
+
+
+def build_samples(df, uniform_rows: int, stratified_rows: int, seed: int = 0) -> Dict[str, Any]:
+    """Uniform and stratified samples of a frame, each with its design (population and sample rows per stratum)"""
+    rng = np.random.default_rng(seed)
+    df = df.drop(columns=[c for c in (STRATUM_COLUMN, TIME_COLUMN) if c in df.columns])
+    timestamp_column = rollups.detect_timestamp_column(df)
+    strata, layout = stratify(df, stratified_rows, timestamp_column)
+    built = {}
+    for kind, codes, budget in (("uniform", np.zeros(len(df), dtype=np.int64), uniform_rows),
+                                ("stratified", strata, stratified_rows)):
+        sizes = np.bincount(codes, minlength=1)
+        allocation = allocate(sizes, budget)
+        rows = _draw(codes, allocation, rng)
+        frame = df.iloc[rows].reset_index(drop=True)
+        frame[STRATUM_COLUMN] = codes[rows].astype(np.int32)
+        frame[TIME_COLUMN] = timestamps(frame, timestamp_column)
+        built[kind] = (frame, {"population": sizes.tolist(), "sampled": allocation.tolist()})
+    return {
+        "timestamp_column": None if timestamp_column is None else str(timestamp_column),
+        "layout": layout,
+        "rows": int(len(df)),
+        "samples": built,
+    }
+
+
+def combine(parts: List[Tuple[Any, Dict[str, Any]]]) -> Tuple[Any, Dict[str, Any]]:
+    """One sample over several datasets: strata stay disjoint, so the union is again a stratified sample"""
+    frames, population, sampled = [], [], []
+    for frame, design in parts:
+        frames.append(frame.assign(**{STRATUM_COLUMN: frame[STRATUM_COLUMN].to_numpy() + len(population)}))
+        population += design["population"]
+        sampled += design["sampled"]
+    frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return frame, {"population": population, "sampled": sampled}
+
+
+def _naive(value: str):
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_convert("UTC").tz_localize(None) if timestamp.tzinfo is not None else timestamp
+
+
+def apply_filters(frame, filters: Optional[Dict[str, Any]] = None, start: Optional[str] = None,
+                  end: Optional[str] = None):
+    """Rows matching column filters (a value or a list of values) and the time range of TIME_COLUMN"""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, value in (filters or {}).items():
+        if column not in frame.columns:
+            raise ValueError(f"Unknown filter column: {column}")
+        mask &= frame[column].isin(value if isinstance(value, list) else [value]).to_numpy()
+    if start:
+        mask &= (frame[TIME_COLUMN] >= _naive(start)).to_numpy()
+    if end:
+        mask &= (frame[TIME_COLUMN] <= _naive(end)).to_numpy()
+    return frame if mask.all() else frame[mask]
+
+
+def measure_name(column: Optional[str], agg: str) -> str:
+    return "count" if agg == "count" else f"{column}_{agg}"
+
+
+def _measure_values(frame, column: Optional[str], agg: str) -> np.ndarray:
+    if agg == "count":
+        return np.ones(len(frame))
+    return pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def estimate(frame, design: Dict[str, Any], group_by: List[str], measures: List[Tuple[Optional[str], str]],
+             confidence: float = 0.95):
+    """Estimated count/sum/mean per group with confidence bounds (`<measure>_low`, `<measure>_high`).
+
+    Totals are weighted by population / sample rows of each stratum. Variances use the stratified estimator with
+    finite-population correction; means are ratio estimates with linearized variance. Rows removed by filters
+    before this call count as outside the domain, not as unsampled.
+    """
+    population = np.asarray(design["population"], dtype=np.float64)
+    sampled = np.asarray(design["sampled"], dtype=np.float64)
+    weight = population / np.maximum(sampled, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(sampled > 1, population ** 2 * (1 - sampled / population) / (sampled * (sampled - 1)), 0.0)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    keys = list(group_by) or ["__all"]
+    data = {STRATUM_COLUMN: frame[STRATUM_COLUMN].to_numpy()}
+    for key in keys:
+        data[key] = frame[key].to_numpy() if key in frame.columns else np.zeros(len(frame), dtype=np.int8)
+    spec = {"sample_rows": (STRATUM_COLUMN, "size")}
+    for i, (column, agg) in enumerate(measures):
+        values = _measure_values(frame, column, agg)
+        data[f"y{i}"], data[f"q{i}"] = values, values * values
+        spec.update({f"c{i}": (f"y{i}", "count"), f"s{i}": (f"y{i}", "sum"), f"q{i}": (f"q{i}", "sum")})
+    cells = pd.DataFrame(data).groupby(keys + [STRATUM_COLUMN], sort=False, dropna=False, observed=True)
+    cells = cells.agg(**spec)
+
+    stratum = cells.index.get_level_values(STRATUM_COLUMN).to_numpy()
+    w, f, n = weight[stratum], factor[stratum], sampled[stratum]
+    per_group = {"level": keys, "sort": True, "dropna": False, "observed": True}
+    by_group = cells.groupby(**per_group)
+    result = pd.DataFrame({"sample_rows": by_group["sample_rows"].sum()})
+    group_index = cells.index.droplevel(STRATUM_COLUMN)
+    for i, (column, agg) in enumerate(measures):
+        c, s, q = cells[f"c{i}"].to_numpy(), cells[f"s{i}"].to_numpy(), cells[f"q{i}"].to_numpy()
+        total = pd.Series(w * s, index=cells.index).groupby(**per_group).sum()
+        if agg == "mean":
+            count = pd.Series(w * c, index=cells.index).groupby(**per_group).sum()
+            value = total / count.where(count > 0)
+            ratio = value.reindex(group_index).to_numpy()
+            dz = s - c * ratio  # Residuals z = y - ratio, summed per cell
+            qz = q - 2 * ratio * s + c * ratio * ratio
+            spread = pd.Series(f * (qz - dz * dz / n), index=cells.index)
+            variance = spread.groupby(**per_group).sum() / (count * count)
+        else:
+            value = total
+            spread = pd.Series(f * (q - s * s / n), index=cells.index)
+            variance = spread.groupby(**per_group).sum()
+        margin = z * np.sqrt(variance.clip(lower=0))
+        name = measure_name(column, agg)
+        result[name] = value
+        result[f"{name}_low"] = value - margin
+        result[f"{name}_high"] = value + margin
+    result = result.reset_index()
+    return result.drop(columns=["__all"]) if not group_by else result
+
+
+def aggregate(frame, group_by: List[str], measures: List[Tuple[Optional[str], str]]):
+    """Exact count/sum/mean per group, with the same output columns as estimate() minus the bounds"""
+    keys = list(group_by) or ["__all"]
+    data = {key: frame[key].to_numpy() if key in frame.columns else np.zeros(len(frame), dtype=np.int8)
+            for key in keys}
+    spec = {}
+    for i, (column, agg) in enumerate(measures):
+        data[f"y{i}"] = _measure_values(frame, column, agg)
+        spec[measure_name(column, agg)] = (f"y{i}", "size" if agg == "count" else agg)
+    grouped = pd.DataFrame(data).groupby(keys, sort=True, dropna=False, observed=True)
+    result = grouped.agg(**spec) if spec else pd.DataFrame(index=grouped.size().index)
+    result.insert(0, "rows", grouped.size())
+    result = result.reset_index()
+    return result.drop(columns=["__all"]) if not group_by else result
+
+
+class SampleStore:
+    """On-disk samples: <root>/<dataset file name>/{uniform,stratified}.pkl plus meta.json with their designs"""
+
+    def __init__(self, root: Path, uniform_rows: int = 100_000, stratified_rows: int = 100_000,
+                 memory_entries: int = 16):
+        self.root = Path(root)
+        self.uniform_rows = uniform_rows
+        self.stratified_rows = stratified_rows
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _dir(self, dataset_name: str) -> Path:
+        return self.root / dataset_name
+
+    def meta(self, dataset_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._dir(dataset_name) / "meta.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, file_path: Path) -> bool:
+        meta = self.meta(file_path.name)
+        return meta is not None and meta.get("source_version") == rollups.RollupStore.source_version(file_path)
+
+    def build(self, file_path: Path, df) -> Dict[str, Any]:
+        """Draw and persist both samples of a freshly ingested file; returns the stored metadata"""
+        built = build_samples(df, self.uniform_rows, self.stratified_rows)
+        target = self._dir(file_path.name)
+        target.mkdir(parents=True, exist_ok=True)
+        designs = {}
+        for kind, (frame, design) in built.pop("samples").items():
+            tmp_path = target / f"{kind}.pkl.tmp"
+            frame.to_pickle(tmp_path)
+            tmp_path.replace(target / f"{kind}.pkl")
+            designs[kind] = design
+        meta = {**built, "designs": designs, "source_version": rollups.RollupStore.source_version(file_path)}
+        tmp_meta = target / "meta.json.tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        tmp_meta.replace(target / "meta.json")
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == file_path.name]:
+                del self._memory[key]
+        return meta
+
+    def load(self, dataset_name: str, kind: str) -> Optional[Tuple[Any, Dict[str, Any], Dict[str, Any]]]:
+        """(sample frame, design, meta) of a dataset, kept in memory while its version is unchanged"""
+        meta = self.meta(dataset_name)
+        if meta is None:
+            return None
+        key = (dataset_name, kind, meta["source_version"])
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        try:
+            frame = pd.read_pickle(self._dir(dataset_name) / f"{kind}.pkl")
+        except (OSError, ValueError):
+            return None
+        loaded = (frame, meta["designs"][kind], meta)
+        with self._lock:
+            self._memory[key] = loaded
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return loaded
+
+    def drop(self, dataset_name: str):
+        target = self._dir(dataset_name)
+        if target.exists():
+            for path in target.iterdir():
+                path.unlink()
+            target.rmdir()
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == dataset_name]:
+                del self._memory[key]
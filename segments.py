@@ -0,0 +1,397 @@
+"""
+Append-only, versioned dataset storage
+An uploaded dataset is a set of immutable segment files described by numbered, immutable manifests. A commit writes a
+new manifest and then atomically swaps the CURRENT pointer, so readers always get a complete snapshot and never see a
+half-written file. Uploads append a segment (or start a version with only the new segment), and a background compactor
+merges runs of small segments into larger columnar files without changing the snapshot's contents.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Not available on Windows; the in-process lock still serializes commits
+    fcntl = None
+
+SEGMENTS_DIR = "segments"
+MANIFESTS_DIR = "manifests"
+CURRENT_FILE = "CURRENT"
+INCOMING_DIR = ".incoming"
+MODES = ("append", "replace")
+
+
+class SnapshotStat:
+    """The subset of os.stat_result the read paths use (size and a content timestamp)"""
+
+    def __init__(self, size: int, mtime_ns: int):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+        self.st_mtime = mtime_ns / 1e9
+
+
+class DatasetSnapshot:
+    """One committed version of a segmented dataset.
+
+    Exposes the parts of the Path interface that dataset readers rely on (name, stem, suffix, stat(), resolve()),
+    plus the ordered list of segment files. stat() reflects the content version, which compaction does not change,
+    so caches keyed on it survive compaction.
+    """
+
+    def __init__(self, dataset_dir: Path, manifest: Dict[str, Any]):
+        self.dataset_dir = dataset_dir
+        self.manifest = manifest
+        self.name: str = manifest["name"]
+        self.version: int = manifest["version"]
+        self.segments: List[Path] = [dataset_dir / SEGMENTS_DIR / s["file"] for s in manifest["segments"]]
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.name).suffix
+
+    @property
+    def stem(self) -> str:
+        return Path(self.name).stem
+
+    def stat(self) -> SnapshotStat:
+        return SnapshotStat(self.manifest["content_bytes"], self.manifest["content_ns"])
+
+    def resolve(self) -> Path:
+        return self.dataset_dir.resolve() / self.name
+
+    def exists(self) -> bool:
+        return all(path.exists() for path in self.segments)
+
+    def __str__(self) -> str:
+        return f"{self.dataset_dir / self.name}@v{self.version}"
+
+    def __repr__(self) -> str:
+        return f"DatasetSnapshot({self})"
+
+
+def _write_json(path: Path, payload: Dict[str, Any]):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+class SegmentStore:
+    """Segmented datasets under <root>/<dataset name>/{segments,manifests,CURRENT}"""
+
+    def __init__(self, root: Path, index_ttl: float = 30.0):
+        self.root = Path(root)
+        self.index_ttl = index_ttl  # Seconds before the snapshot index is re-read (commits by other processes)
+        self._lock = threading.Lock()
+        self._manifests: Dict[Tuple[str, int], Dict[str, Any]] = {}  # Manifests are immutable once written
+        self._index: Optional[Dict[str, DatasetSnapshot]] = None  # Dataset name -> current snapshot
+        self._indexed_at = 0.0
+        self._index_lock = threading.Lock()
+
+    def _dir(self, name: str) -> Path:
+        if not name or "/" in name or "\\" in name or name.startswith("."):
+            raise ValueError(f"Invalid dataset name: {name}")
+        return self.root / name
+
+    @contextmanager
+    def _locked(self, name: str):
+        """Serialize commits to one dataset across threads and (where fcntl exists) processes"""
+        dataset_dir = self._dir(name)
+        dataset_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield dataset_dir
+                return
+            with open(dataset_dir / ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield dataset_dir
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def incoming_path(self, suffix: str) -> Path:
+        """Staging path for a new segment, on the same file system so committing it is a rename"""
+        incoming = self.root / INCOMING_DIR
+        incoming.mkdir(parents=True, exist_ok=True)
+        return incoming / f"{uuid.uuid4().hex}{suffix}"
+
+    def current_version(self, name: str) -> Optional[int]:
+        try:
+            return int((self._dir(name) / CURRENT_FILE).read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _manifest(self, name: str, version: int) -> Optional[Dict[str, Any]]:
+        key = (name, version)
+        manifest = self._manifests.get(key)
+        if manifest is None:
+            try:
+                with open(self._dir(name) / MANIFESTS_DIR / f"{version:08d}.json") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._manifests[key] = manifest
+        return manifest
+
+    def snapshot(self, name: str, version: Optional[int] = None) -> Optional[DatasetSnapshot]:
+        version = self.current_version(name) if version is None else version
+        if version is None:
+            return None
+        manifest = self._manifest(name, version)
+        return DatasetSnapshot(self._dir(name), manifest) if manifest is not None else None
+
+    def names(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir()
+                      if p.is_dir() and not p.name.startswith(".") and (p / CURRENT_FILE).exists())
+
+    def snapshots(self, prefix: Optional[str] = None) -> List[DatasetSnapshot]:
+        """Current snapshot of every dataset, optionally only names starting with prefix.
+
+        Served from memory: commits and deletes through this store update the index, and it is re-read from disk
+        only after index_ttl seconds.
+        """
+        with self._index_lock:
+            if self._index is None or time.monotonic() - self._indexed_at > self.index_ttl:
+                index = {}
+                for name in self.names():
+                    snapshot = self.snapshot(name)
+                    if snapshot is not None:
+                        index[name] = snapshot
+                self._index, self._indexed_at = index, time.monotonic()
+            index = self._index
+        return [index[name] for name in sorted(index) if not prefix or name.startswith(prefix)]
+
+    def _update_index(self, name: str, snapshot: Optional[DatasetSnapshot]):
+        with self._index_lock:
+            if self._index is None:
+                return
+            if snapshot is None:
+                self._index.pop(name, None)
+            else:
+                self._index[name] = snapshot
+
+    def versions(self, name: str) -> List[Dict[str, Any]]:
+        manifests_dir = self._dir(name) / MANIFESTS_DIR
+        if not manifests_dir.exists():
+            return []
+        summaries = []
+        for path in sorted(manifests_dir.glob("*.json")):
+            manifest = self._manifest(name, int(path.stem))
+            if manifest is None:
+                continue
+            summaries.append({
+                "version": manifest["version"],
+                "operation": manifest["operation"],
+                "committed_at": manifest["committed_at"],
+                "segments": len(manifest["segments"]),
+                "bytes": sum(s["bytes"] for s in manifest["segments"]),
+                "rows": manifest.get("rows"),
+            })
+        return summaries
+
+    def _commit(self, dataset_dir: Path, name: str, segments: List[Dict[str, Any]], operation: str,
+                content_changed: bool) -> DatasetSnapshot:
+        """Write manifest N+1 and swap CURRENT to it; callers hold the dataset lock"""
+        current = self.current_version(name)
+        previous = self._manifest(name, current) if current is not None else None
+        version = (current or 0) + 1
+        rows = [s.get("rows") for s in segments]
+        manifest = {
+            "name": name,
+            "version": version,
+            "operation": operation,
+            "committed_at": time.time(),
+            # Only data changes move the content version; compaction keeps it so derived caches stay valid
+            "content_ns": time.time_ns() if content_changed or previous is None else previous["content_ns"],
+            "content_bytes": (sum(s["bytes"] for s in segments) if content_changed or previous is None
+                              else previous["content_bytes"]),
+            "rows": sum(rows) if None not in rows else None,
+            "segments": segments,
+        }
+        (dataset_dir / MANIFESTS_DIR).mkdir(exist_ok=True)
+        _write_json(dataset_dir / MANIFESTS_DIR / f"{version:08d}.json", manifest)
+        tmp_current = dataset_dir / f"{CURRENT_FILE}.tmp"
+        tmp_current.write_text(str(version))
+        tmp_current.replace(dataset_dir / CURRENT_FILE)
+        self._manifests[(name, version)] = manifest
+        snapshot = DatasetSnapshot(dataset_dir, manifest)
+        self._update_index(name, snapshot)
+        return snapshot
+
+    def _adopt(self, dataset_dir: Path, source: Path, rows: Optional[int], suffix: Optional[str] = None) -> Dict[str, Any]:
+        """Move a staged file into the segment directory (rename, never copied or modified afterwards)"""
+        segments_dir = dataset_dir / SEGMENTS_DIR
+        segments_dir.mkdir(exist_ok=True)
+        file_name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}{suffix or source.suffix}"
+        os.replace(source, segments_dir / file_name)
+        return {"file": file_name, "bytes": (segments_dir / file_name).stat().st_size, "rows": rows,
+                "created_at": time.time()}
+
+    def append(self, name: str, source: Path, mode: str = "append", rows: Optional[int] = None) -> DatasetSnapshot:
+        """Commit a staged file as a new segment; mode="replace" starts a version containing only this segment"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}. Use one of {', '.join(MODES)}")
+        with self._locked(name) as dataset_dir:
+            current = self.snapshot(name)
+            segment = self._adopt(dataset_dir, source, rows)
+            segments = ([] if mode == "replace" or current is None else list(current.manifest["segments"])) + [segment]
+            return self._commit(dataset_dir, name, segments, mode, content_changed=True)
+
+    def delete(self, name: str) -> bool:
+        dataset_dir = self._dir(name)
+        if not dataset_dir.exists():
+            return False
+        with self._lock:
+            shutil.rmtree(dataset_dir, ignore_errors=True)
+            for key in [k for k in self._manifests if k[0] == name]:
+                del self._manifests[key]
+        self._update_index(name, None)
+        return True
+
+    def compact(self, name: str, reader: Callable[[Path], Any], writer: Callable[[Any, Path], None],
+                suffix: str, small_bytes: int, min_segments: int = 4) -> Optional[DatasetSnapshot]:
+        """Merge runs of consecutive small segments into one columnar segment each; returns the new snapshot if any.
+
+        The merge itself runs without the lock; the commit re-checks the manifest and keeps segments appended
+        in the meantime, and gives up if the dataset was replaced.
+        """
+        base = self.snapshot(name)
+        if base is None:
+            return None
+        entries = base.manifest["segments"]
+        small = [s["bytes"] < small_bytes for s in entries]
+        if sum(small) < min_segments:
+            return None
+
+        runs, start = [], None
+        for i, is_small in enumerate(small + [False]):
+            if is_small and start is None:
+                start = i
+            elif not is_small and start is not None:
+                if i - start >= 2:
+                    runs.append((start, i))
+                start = None
+        if not runs:
+            return None
+
+        dataset_dir = self._dir(name)
+        merged: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+        for run_start, run_end in runs:
+            import pandas as pd  # Segment merging needs pandas; the store itself does not
+            frames = [reader(dataset_dir / SEGMENTS_DIR / entry["file"]) for entry in entries[run_start:run_end]]
+            frame = pd.concat(frames, ignore_index=True)
+            staged = self.incoming_path(suffix)
+            writer(frame, staged)
+            merged[run_start] = (run_end, {"staged": staged, "rows": len(frame)})
+
+        with self._locked(name) as dataset_dir:
+            latest = self.snapshot(name)
+            latest_entries = latest.manifest["segments"] if latest is not None else []
+            if latest_entries[:len(entries)] != entries:
+                for _, info in merged.values():
+                    info["staged"].unlink(missing_ok=True)
+                return None  # Replaced or rewritten concurrently; try again next round
+            segments, i = [], 0
+            while i < len(entries):
+                if i in merged:
+                    run_end, info = merged[i]
+                    segments.append(self._adopt(dataset_dir, info["staged"], info["rows"]))
+                    i = run_end
+                else:
+                    segments.append(entries[i])
+                    i += 1
+            segments += latest_entries[len(entries):]
+            return self._commit(dataset_dir, name, segments, "compact", content_changed=False)
+
+    def gc(self, name: str, keep_versions: int = 10, grace_seconds: float = 600.0) -> int:
+        """Drop manifests beyond the newest keep_versions and segments no remaining manifest references.
+
+        Only files older than grace_seconds are removed, so readers holding a recent snapshot can finish.
+        """
+        dataset_dir = self._dir(name)
+        manifests_dir = dataset_dir / MANIFESTS_DIR
+        segments_dir = dataset_dir / SEGMENTS_DIR
+        if not manifests_dir.exists():
+            return 0
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        with self._locked(name):
+            current = self.current_version(name)
+            paths = sorted(manifests_dir.glob("*.json"))
+            for path in paths[:-keep_versions] if keep_versions > 0 else paths:
+                version = int(path.stem)
+                if version != current and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    self._manifests.pop((name, version), None)
+            referenced = set()
+            for path in manifests_dir.glob("*.json"):
+                manifest = self._manifest(name, int(path.stem))
+                if manifest is not None:
+                    referenced.update(s["file"] for s in manifest["segments"])
+            for path in segments_dir.iterdir() if segments_dir.exists() else []:
+                if path.name not in referenced and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+        return removed
+
+
+class SegmentCompactor:
+    """Background thread compacting and garbage-collecting every dataset of a store"""
+
+    def __init__(self, store_provider: Callable[[], SegmentStore], reader: Callable[[Path], Any],
+                 writer: Callable[[Any, Path], None], suffix: str, interval: float = 300.0,
+                 small_bytes: int = 64 * 1024 * 1024, min_segments: int = 4, keep_versions: int = 10,
+                 grace_seconds: float = 600.0, on_compacted: Optional[Callable[[DatasetSnapshot], None]] = None):
+        self.store_provider = store_provider
+        self.reader = reader
+        self.writer = writer
+        self.suffix = suffix
+        self.interval = interval
+        self.small_bytes = small_bytes
+        self.min_segments = min_segments
+        self.keep_versions = keep_versions
+        self.grace_seconds = grace_seconds
+        self.on_compacted = on_compacted
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> List[DatasetSnapshot]:
+        store = self.store_provider()
+        compacted = []
+        for name in store.names():
+            try:
+                snapshot = store.compact(name, self.reader, self.writer, self.suffix, self.small_bytes,
+                                         self.min_segments)
+                if snapshot is not None:
+                    compacted.append(snapshot)
+                    if self.on_compacted is not None:
+                        self.on_compacted(snapshot)
+                store.gc(name, self.keep_versions, self.grace_seconds)
+            except Exception as e:
+                print(f"⚠️ Compaction of {name} failed: {e}")
+        return compacted
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="segment-compactor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
@@ -7,7 +7,8 @@ import os
 import json
 import io
 import uuid
-import csv
+import threading
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 from datetime import datetime
@@ -18,15 +19,71 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 
+import metrics
+import admission
+import profiling
+import responses
+import watcher
+import ingest
+
 # --- CONFIGURATION ---
 MODEL_FILE_PATH = "./gemma-3-4b-it-Q8_0.gguf"
 DATA_FOLDER_PATH = "./data"
+METRICS_ENABLED = True  # Expose Prometheus metrics at /metrics
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")  # Opt-in per-request profiling
+PROFILING_OUTPUT_PATH = "./profiles"
+PROFILING_MAX_PER_MINUTE = 6
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")  # Optional shared secret required in the X-Profile header
+DATASET_EXTENSIONS = ['.csv', '.json', '.xlsx']
+WATCH_DATA_FOLDER = True  # Keep an in-memory dataset catalog updated from file system events
+WATCH_DEBOUNCE_SECONDS = 1.0  # Quiet period before a changed file is (re-)indexed
+WATCH_POLL_INTERVAL = 2.0  # Used when inotify is unavailable
+# Heavy routes: route template -> (max concurrent, max queued); requests beyond the queue get 429 + Retry-After
+ADMISSION_LIMITS = {
+    "/api/upload-data": (2, 4),
+    "/api/operation-data/{operation_type}": (4, 16),
+}
+ADMISSION_QUEUE_TIMEOUT = 10.0  # Seconds a queued request waits before it is shed with 503
+ADMISSION_RETRY_AFTER = 5  # Seconds advertised in Retry-After
+COMPRESSION_MIN_SIZE = 1024  # Responses smaller than this are sent uncompressed
+COMPRESSION_LEVEL = 5
+INGEST_BACKEND = os.environ.get("INGEST_BACKEND")  # Force a parser (stdlib, pandas-c, pandas-pyarrow, pyarrow-csv)
+INGEST_CALIBRATE = True  # Benchmark the available parsers at startup to pick one per file size
+INGEST_CALIBRATION_FILE = ".ingest_calibration.json"  # Cached benchmark results, kept inside the data folder
+
+# Dataset catalog fed by the data folder watcher; None until the app starts
+dataset_catalog: Optional[watcher.DatasetCatalog] = None
+
+# Same parser backends as the full server: the fastest reader installed on this box
+dataset_parsers = ingest.ParserSelector(forced=INGEST_BACKEND)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the data folder watcher with the app and stop it on shutdown"""
+    global dataset_catalog
+    folder_watcher = None
+    if INGEST_CALIBRATE:
+        threading.Thread(
+            target=dataset_parsers.calibrate, args=(Path(DATA_FOLDER_PATH) / INGEST_CALIBRATION_FILE,),
+            name="parser-calibration", daemon=True
+        ).start()
+    if WATCH_DATA_FOLDER:
+        dataset_catalog = watcher.DatasetCatalog(Path(DATA_FOLDER_PATH), DATASET_EXTENSIONS, profiler=index_dataset_file)
+        folder_watcher = watcher.DataFolderWatcher(
+            dataset_catalog, debounce_seconds=WATCH_DEBOUNCE_SECONDS, poll_interval=WATCH_POLL_INTERVAL
+        ).start()
+    yield
+    if folder_watcher is not None:
+        folder_watcher.stop()
+    dataset_catalog = None
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Honeywell Terminal Manager API",
     description="AI-powered backend for terminal operations management",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=responses.FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -38,6 +95,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip compression for large responses (installed before metrics so sizes are wire sizes)
+responses.install(app, min_size=COMPRESSION_MIN_SIZE, level=COMPRESSION_LEVEL)
+
+# Concurrency limits and bounded queues for heavy routes, so light requests keep low latency under bursts
+admission.install(app, ADMISSION_LIMITS, queue_timeout=ADMISSION_QUEUE_TIMEOUT, retry_after=ADMISSION_RETRY_AFTER)
+
+# Per-route latency/size metrics and the /metrics scrape endpoint
+if METRICS_ENABLED:
+    metrics.install(app)
+
+# Per-request profiling, triggered with `X-Profile: cprofile|sample` or `?profile=...` when enabled
+profiling.install(app, profiling.RequestProfiler(
+    enabled=PROFILING_ENABLED,
+    output_dir=PROFILING_OUTPUT_PATH,
+    max_per_minute=PROFILING_MAX_PER_MINUTE,
+    token=PROFILING_TOKEN
+))
+
 # Ensure data folder exists
 os.makedirs(DATA_FOLDER_PATH, exist_ok=True)
 
@@ -83,6 +158,7 @@ class AIModel:
             print(f"⚠️ Error loading model: {e}")
             self.model = None
     
+    @metrics.timed("generate_response")
     def generate_response(self, message: str, context: Dict[str, Any]) -> ChatResponse:
         """Generate AI response to user message"""
         return self._rule_based_response(message, context)
@@ -142,55 +218,15 @@ class AIModel:
 # Initialize AI model
 ai_model = AIModel(MODEL_FILE_PATH)
 
+@metrics.timed("analyze_file_content")
 def analyze_file_content(file_path: Path, file_extension: str) -> tuple:
-    """Analyze file content without pandas"""
+    """Analyze file content with the fastest available parser (stdlib streaming pass when nothing else is installed)"""
     try:
-        if file_extension == '.csv':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                headers = next(reader, [])
-                rows = list(reader)
-                
-                columns = []
-                for header in headers:
-                    # Simple type detection
-                    col_type = "string"
-                    if any(word in header.lower() for word in ['date', 'time']):
-                        col_type = "date"
-                    elif any(word in header.lower() for word in ['count', 'num', 'value', 'rate', 'percent', 'score']):
-                        col_type = "number"
-                    
-                    columns.append({
-                        "name": header,
-                        "type": col_type,
-                        "null_count": 0,
-                        "unique_count": len(set(row[headers.index(header)] for row in rows if len(row) > headers.index(header))),
-                        "sample_values": [row[headers.index(header)] for row in rows[:5] if len(row) > headers.index(header)]
-                    })
-                
-                return len(rows), len(headers), columns
-                
-        elif file_extension == '.json':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                if isinstance(data, list) and data:
-                    first_item = data[0]
-                    if isinstance(first_item, dict):
-                        columns = []
-                        for key in first_item.keys():
-                            columns.append({
-                                "name": key,
-                                "type": "string",
-                                "null_count": 0,
-                                "unique_count": len(set(item.get(key) for item in data)),
-                                "sample_values": [item.get(key) for item in data[:5]]
-                            })
-                        return len(data), len(first_item.keys()), columns
-                
-                return 1, 1, [{"name": "data", "type": "string", "null_count": 0, "unique_count": 1, "sample_values": [str(data)[:100]]}]
-                
-        else:  # xlsx or other
+        if dataset_parsers.candidates(ingest.file_format(file_path), frame=False):
+            profile = dataset_parsers.profile(file_path)
+            return profile["row_count"], len(profile["columns"]), profile["columns"]
+        
+        else:  # xlsx without pandas
             # For Excel files, return simulated data since we don't have openpyxl working
             return 100, 5, [
                 {"name": "timestamp", "type": "date", "null_count": 0, "unique_count": 100, "sample_values": ["2024-01-01", "2024-01-02"]},
@@ -233,6 +269,34 @@ async def chat(message: ChatMessage):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+@app.get("/api/ingest/status")
+async def get_ingest_status():
+    """Available parser backends, their calibrated costs and which one is used for typical CSV sizes"""
+    return dataset_parsers.status()
+
+def active_catalog() -> Optional[watcher.DatasetCatalog]:
+    """The watcher's catalog once its initial scan is done (and only for the configured data folder)"""
+    catalog = dataset_catalog
+    if catalog is None or not catalog.ready or catalog.root != Path(DATA_FOLDER_PATH):
+        return None
+    return catalog
+
+def index_dataset_file(file_path: Path) -> Dict[str, Any]:
+    """Catalog profiler for files that appear in the data folder"""
+    metrics.count("catalog_index")
+    file_stats = file_path.stat()
+    row_count, column_count, columns = analyze_file_content(file_path, file_path.suffix.lower())
+    return {
+        "id": f"{file_path.stem}_{int(file_stats.st_mtime)}",
+        "name": file_path.name,
+        "operation_type": watcher.operation_type_from_name(file_path.name),
+        "file_size": file_stats.st_size,
+        "row_count": row_count,
+        "column_count": column_count,
+        "columns": columns,
+        "upload_date": datetime.fromtimestamp(file_stats.st_mtime).isoformat()
+    }
+
 @app.post("/api/upload-data")
 async def upload_data(
     files: List[UploadFile] = File(...),
@@ -261,8 +325,10 @@ async def upload_data(
             file_path = Path(DATA_FOLDER_PATH) / f"{operation_type}_{file.filename}"
             
             content = await file.read()
-            with open(file_path, "wb") as buffer:
-                buffer.write(content)
+            with metrics.timer("file_write"):
+                with open(file_path, "wb") as buffer:
+                    buffer.write(content)
+            metrics.count("bytes_uploaded", len(content))
             
             # Process file and create dataset info
             file_stats = file_path.stat()
@@ -281,6 +347,11 @@ async def upload_data(
                 "upload_date": datetime.now().isoformat()
             }
             uploaded_files.append(dataset_info)
+            
+            # Record the upload so the watcher does not analyze the same version again
+            catalog = active_catalog()
+            if catalog is not None:
+                catalog.refresh(file_path, info={**dataset_info, "name": file_path.name})
         
         return {
             "status": "success",
@@ -295,12 +366,16 @@ async def upload_data(
 async def get_datasets(operation_type: Optional[str] = None):
     """Get list of uploaded datasets"""
     try:
+        catalog = active_catalog()
+        if catalog is not None:
+            return {"datasets": catalog.infos(operation_type)}
+        
         datasets = []
         data_folder = Path(DATA_FOLDER_PATH)
         
         if data_folder.exists():
             for file_path in data_folder.iterdir():
-                if file_path.suffix.lower() in ['.csv', '.json', '.xlsx']:
+                if file_path.suffix.lower() in DATASET_EXTENSIONS:
                     if operation_type and not file_path.name.startswith(f"{operation_type}_"):
                         continue
                     
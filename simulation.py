@@ -0,0 +1,187 @@
+"""
+Vectorized Monte Carlo scenario simulation for the Simulator view
+Runs thousands of replications of a scenario at once with NumPy (replications x time steps) and
+summarizes them as percentile bands and event distributions
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+DIFFICULTY_MULTIPLIERS = {"easy": 1.0, "medium": 0.9, "hard": 0.8}
+# Scenario event rates scale with difficulty (hard shifts see more disruptions)
+DIFFICULTY_EVENT_SCALE = {"easy": 0.6, "medium": 1.0, "hard": 1.6}
+
+# Event type -> (events per hour at medium difficulty, throughput impact, efficiency impact, duration in minutes)
+EVENT_PROFILES = {
+    "info": (2.0, 0.0, 0.0, 0),
+    "success": (0.8, -0.03, -0.02, 30),   # negative impact = temporary boost
+    "delay": (0.6, 0.12, 0.06, 25),
+    "alert": (0.4, 0.08, 0.05, 20),
+    "critical": (0.05, 0.35, 0.20, 45),
+}
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+MAX_CELLS = 20_000_000  # replications x steps held in memory per metric
+RANDOM_VARIATION = 0.1  # +/-5% per step, as the client-side simulator used
+
+
+def simulate_scenario(
+    base_kpis: Dict[str, float],
+    duration: int,
+    difficulty: str = "medium",
+    replications: int = 2000,
+    step_minutes: int = 1,
+    seed: Optional[int] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    max_points: int = 120,
+    targets: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """Simulate `replications` runs of a `duration`-minute scenario in one vectorized pass"""
+    if difficulty not in DIFFICULTY_MULTIPLIERS:
+        raise ValueError(f"Unknown difficulty: {difficulty}. Use one of {', '.join(DIFFICULTY_MULTIPLIERS)}")
+    if duration <= 0 or replications <= 0 or step_minutes <= 0:
+        raise ValueError("duration, replications and step_minutes must be positive")
+
+    # Coarsen the time step rather than exhausting memory on very long or wide runs
+    steps = duration // step_minutes + 1
+    while replications * steps > MAX_CELLS:
+        step_minutes *= 2
+        steps = duration // step_minutes + 1
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(steps, dtype=np.float32) * step_minutes
+    difficulty_multiplier = DIFFICULTY_MULTIPLIERS[difficulty]
+    progress = (np.sin(t / duration * np.pi) * 0.2 + 0.9).astype(np.float32)  # performance curve over the shift
+
+    # Per-step random variation, shared by all metrics of a replication
+    variation = (rng.random((replications, steps), dtype=np.float32) - 0.5) * RANDOM_VARIATION
+
+    # Events: per-replication counts ~ Binomial(steps, p), placed at random steps. Each event's impact is added
+    # over its duration with a difference array (+impact at start, -impact at end) and one cumulative sum.
+    event_scale = DIFFICULTY_EVENT_SCALE[difficulty]
+    positions, throughput_weights, efficiency_weights = [], [], []
+    event_counts = {}
+    first_critical = None
+    for event_type, (per_hour, throughput_impact, efficiency_impact, minutes) in EVENT_PROFILES.items():
+        probability = min(per_hour * event_scale * step_minutes / 60.0, 1.0)
+        counts = rng.binomial(steps, probability, size=replications)
+        event_counts[event_type] = counts
+        rows = np.repeat(np.arange(replications), counts)
+        starts = rng.integers(0, steps, size=rows.size)
+        if event_type == "critical":
+            earliest = np.full(replications, steps, dtype=np.int64)
+            np.minimum.at(earliest, rows, starts)
+            first_critical = np.where(counts > 0, earliest * step_minutes, -1)
+        if minutes <= 0 or (throughput_impact == 0 and efficiency_impact == 0) or not rows.size:
+            continue
+        ends = np.minimum(starts + max(1, int(round(minutes / step_minutes))), steps)
+        positions += [rows * (steps + 1) + starts, rows * (steps + 1) + ends]
+        signs = np.ones(rows.size)
+        throughput_weights += [signs * throughput_impact, signs * -throughput_impact]
+        efficiency_weights += [signs * efficiency_impact, signs * -efficiency_impact]
+
+    def impact_factor(weights, low, high):
+        if not positions:
+            return np.ones((replications, steps), dtype=np.float32)
+        diff = np.bincount(np.concatenate(positions), weights=np.concatenate(weights),
+                           minlength=replications * (steps + 1)).astype(np.float32)
+        # Multiplicative factor computed in place to keep a single replications x steps buffer
+        factor = np.cumsum(diff.reshape(replications, steps + 1)[:, :steps], axis=1)
+        np.subtract(1.0, factor, out=factor)
+        return np.clip(factor, low, high, out=factor)
+
+    throughput_factor = impact_factor(throughput_weights, 0.2, 1.3)
+    efficiency_factor = impact_factor(efficiency_weights, 0.3, 1.2)
+
+    base_throughput = float(base_kpis.get("throughput", 150))
+    base_efficiency = float(base_kpis.get("efficiency", 85))
+    base_response = float(base_kpis.get("avgProcessingTime", 45))
+    curve = (progress * difficulty_multiplier)[None, :]
+
+    throughput = variation + np.float32(1.0)
+    throughput *= throughput_factor
+    throughput *= curve * np.float32(base_throughput)
+
+    efficiency = variation * np.float32(0.5)
+    efficiency += np.float32(1.0)
+    efficiency *= efficiency_factor
+    efficiency *= curve * np.float32(base_efficiency)
+    np.minimum(efficiency, 100.0, out=efficiency)
+
+    response_time = variation * np.float32(0.3)
+    response_time += np.float32(1.0)
+    response_time /= throughput_factor
+    response_time *= ((2 - difficulty_multiplier) * (2 - progress) * base_response).astype(np.float32)[None, :]
+
+    series = {"throughput": throughput, "efficiency": efficiency, "responseTime": response_time}
+
+    # Percentile bands, downsampled to at most max_points time steps
+    stride = max(1, int(np.ceil(steps / max_points)))
+    band_index = np.arange(0, steps, stride)
+    bands = {}
+    for metric, values in series.items():
+        quantiles = np.percentile(values[:, band_index], percentiles, axis=0)
+        bands[metric] = [
+            {"minute": int(t[i]), **{f"p{_label(p)}": round(float(q[j]), 2) for p, q in zip(percentiles, quantiles)}}
+            for j, i in enumerate(band_index)
+        ]
+
+    # Whole-scenario outcome distributions per replication
+    minutes_per_step = step_minutes / 60.0
+    outcomes = {
+        "total_throughput": series["throughput"].sum(axis=1) * minutes_per_step,
+        "mean_efficiency": series["efficiency"].mean(axis=1),
+        "mean_response_time": series["responseTime"].mean(axis=1),
+        "min_efficiency": series["efficiency"].min(axis=1),
+    }
+    summary = {name: _distribution(values, percentiles) for name, values in outcomes.items()}
+
+    events = {}
+    for event_type, counts in event_counts.items():
+        events[event_type] = {
+            **_distribution(counts, percentiles),
+            "probability_at_least_one": round(float((counts > 0).mean()), 4),
+        }
+    if first_critical is not None and (first_critical >= 0).any():
+        hit = first_critical[first_critical >= 0]
+        events["critical"]["first_occurrence_minute"] = _distribution(hit, percentiles)
+
+    result = {
+        "replications": replications,
+        "duration": duration,
+        "step_minutes": step_minutes,
+        "difficulty": difficulty,
+        "base_kpis": {"throughput": base_throughput, "efficiency": base_efficiency, "avgProcessingTime": base_response},
+        "bands": bands,
+        "summary": summary,
+        "events": events,
+    }
+    if targets:
+        result["target_probabilities"] = _target_probabilities(outcomes, targets)
+    return result
+
+
+def _label(p: float) -> str:
+    return str(int(p)) if float(p).is_integer() else str(p).replace(".", "_")
+
+
+def _distribution(values: np.ndarray, percentiles: Sequence[float]) -> Dict[str, float]:
+    quantiles = np.percentile(values, percentiles)
+    return {
+        "mean": round(float(np.mean(values)), 3),
+        "std": round(float(np.std(values)), 3),
+        **{f"p{_label(p)}": round(float(q), 3) for p, q in zip(percentiles, quantiles)},
+    }
+
+
+def _target_probabilities(outcomes: Dict[str, np.ndarray], targets: Dict[str, float]) -> Dict[str, float]:
+    """P(outcome meets target); response time targets are upper bounds, everything else lower bounds"""
+    probabilities = {}
+    for name, target in targets.items():
+        values = outcomes.get(name)
+        if values is None:
+            continue
+        met = values <= target if "response_time" in name else values >= target
+        probabilities[name] = round(float(met.mean()), 4)
+    return probabilities
@@ -0,0 +1,50 @@
+"""
+Regression tests for rollup level selection across datasets
+Run with: python -m pytest -q test_rollups.py
+"""
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import rollups  # noqa: E402
+
+
+def _materialize(store, tmp_path, name, frame):
+    path = tmp_path / name
+    frame.to_csv(path, index=False)
+    store.materialize(path, frame)
+    return path
+
+
+def test_datasets_with_mixed_spans_share_one_level(tmp_path):
+    """A short dataset next to a long one must not come back at its own finer level"""
+    store = rollups.RollupStore(tmp_path / ".rollups")
+    short = pd.DataFrame({"timestamp": pd.date_range("2026-01-10", periods=300, freq="min"), "throughput": 10.0})
+    long = pd.DataFrame({"timestamp": pd.date_range("2025-12-20", periods=30 * 24, freq="h"), "throughput": 20.0})
+    _materialize(store, tmp_path, "short.csv", short)
+    _materialize(store, tmp_path, "long.csv", long)
+
+    level = store.common_level(["short.csv", "long.csv"])
+    assert level == "day"
+    results = [store.query(name, resolution=level) for name in ("short.csv", "long.csv")]
+    assert {found_level for found_level, _ in results} == {"day"}
+
+    # Every bucket of both datasets is a whole day, so merged buckets combine like with like
+    for _, rollup in results:
+        assert (rollup.index == rollup.index.floor("D")).all()
+    merged = pd.concat([r for _, r in results]).groupby(level=0).sum()
+    bucket = merged.loc[pd.Timestamp("2026-01-10")]
+    assert bucket["throughput__count"] == 300 + 24
+    assert bucket["throughput__sum"] == 300 * 10.0 + 24 * 20.0
+
+
+def test_common_level_follows_requested_range(tmp_path):
+    store = rollups.RollupStore(tmp_path / ".rollups")
+    frame = pd.DataFrame({"timestamp": pd.date_range("2026-01-01", periods=60 * 24 * 10, freq="min"),
+                          "throughput": 1.0})
+    _materialize(store, tmp_path, "minutes.csv", frame)
+
+    assert store.common_level(["minutes.csv"]) == "hour"
+    assert store.common_level(["minutes.csv"], "2026-01-05", "2026-01-05 06:00") == "minute"
+    assert store.common_level(["missing.csv"]) is None
@@ -0,0 +1,226 @@
+"""
+Resumable chunked uploads
+A session preallocates the target file; numbered chunks can arrive in any order and in parallel and are written in
+place with positional writes, each verified against its SHA-256. The session state survives restarts, so a client
+asks which chunks are missing and resumes. Finalizing moves the assembled file into the data folder (a rename, no copy).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+SESSION_TTL_SECONDS = 24 * 3600
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """Client-side problem with an upload request; carries the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _preallocate(path: Path, size: int):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+            except OSError:
+                pass  # Not supported by the file system; fall back to a sparse file
+        os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int):
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+class UploadSessionStore:
+    """Upload sessions under <root>: <id>.part holds the data, <id>.json the session state"""
+
+    def __init__(self, root: Path, default_chunk_size: int = DEFAULT_CHUNK_SIZE, max_size: Optional[int] = None,
+                 ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.root = Path(root)
+        self.default_chunk_size = default_chunk_size
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def _data_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    def _load(self, upload_id: str) -> Dict[str, Any]:
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise UploadError(404, "Upload session not found")
+        try:
+            with open(self._meta_path(upload_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadError(404, "Upload session not found")
+
+    def _save(self, session: Dict[str, Any]):
+        tmp_path = self.root / f"{session['upload_id']}.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(session, f)
+        tmp_path.replace(self._meta_path(session["upload_id"]))
+
+    def create(self, filename: str, size: int, target_name: str, chunk_size: Optional[int] = None,
+               sha256: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        chunk_size = chunk_size or self.default_chunk_size
+        if size < 0 or (self.max_size is not None and size > self.max_size):
+            raise UploadError(413 if size > 0 else 400, f"Upload size must be between 0 and {self.max_size} bytes")
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise UploadError(400, f"chunk_size must be between 1 and {MAX_CHUNK_SIZE} bytes")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.expire()
+
+        upload_id = uuid.uuid4().hex
+        _preallocate(self._data_path(upload_id), size)
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "target_name": target_name,
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunk_count": max(1, -(-size // chunk_size)),
+            "sha256": sha256.lower() if sha256 else None,
+            "received": [],
+            "created_at": time.time(),
+            **(extra or {}),
+        }
+        with self._lock:
+            self._save(session)
+        return self.status(upload_id)
+
+    def _chunk_range(self, session: Dict[str, Any], index: int):
+        if not 0 <= index < session["chunk_count"]:
+            raise UploadError(416, f"Chunk index must be between 0 and {session['chunk_count'] - 1}")
+        offset = index * session["chunk_size"]
+        return offset, min(session["chunk_size"], session["size"] - offset)
+
+    async def write_chunk(self, upload_id: str, index: int, body: AsyncIterator[bytes],
+                          sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Stream one chunk into place; it only counts as received when length and checksum match"""
+        session = self._load(upload_id)
+        offset, expected = self._chunk_range(session, index)
+        if index in session["received"]:
+            # Retried after a lost response: keep the verified bytes rather than overwrite them
+            return {"upload_id": upload_id, "index": index, "duplicate": True,
+                    "received_chunks": len(session["received"]), "chunk_count": session["chunk_count"]}
+        hasher = hashlib.sha256()
+        written = 0
+        fd = os.open(self._data_path(upload_id), os.O_WRONLY)
+        try:
+            async for piece in body:
+                if not piece:
+                    continue
+                if written + len(piece) > expected:
+                    raise UploadError(400, f"Chunk {index} is longer than {expected} bytes")
+                _pwrite_all(fd, piece, offset + written)
+                hasher.update(piece)
+                written += len(piece)
+        finally:
+            os.close(fd)
+        if written != expected:
+            raise UploadError(400, f"Chunk {index} has {written} bytes, expected {expected}")
+        if sha256 and hasher.hexdigest() != sha256.lower():
+            raise UploadError(422, f"Checksum mismatch for chunk {index}")
+
+        with self._lock:
+            session = self._load(upload_id)  # Re-read: other chunks may have landed meanwhile
+            if index not in session["received"]:
+                session["received"].append(index)
+                self._save(session)
+        return {"upload_id": upload_id, "index": index, "sha256": hasher.hexdigest(),
+                "received_chunks": len(session["received"]), "chunk_count": session["chunk_count"]}
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        session = self._load(upload_id)
+        received = set(session["received"])
+        missing = [i for i in range(session["chunk_count"]) if i not in received]
+        return {
+            **{k: v for k, v in session.items() if k != "received"},
+            "received_chunks": len(received),
+            "received_bytes": sum(self._chunk_range(session, i)[1] for i in received),
+            "missing": [{"index": i, "offset": i * session["chunk_size"], "length": self._chunk_range(session, i)[1]}
+                        for i in missing],
+            "complete": not missing,
+        }
+
+    def finalize(self, upload_id: str, destination: Path) -> Dict[str, Any]:
+        """Verify completeness (and the whole-file checksum if one was declared), then move into place"""
+        session = self._load(upload_id)
+        missing = session["chunk_count"] - len(set(session["received"]))
+        if missing:
+            raise UploadError(409, f"{missing} chunks are still missing")
+        data_path = self._data_path(upload_id)
+        if session["sha256"]:
+            hasher = hashlib.sha256()
+            with open(data_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+            if hasher.hexdigest() != session["sha256"]:
+                raise UploadError(422, "Checksum mismatch for the assembled file")
+        fd = os.open(data_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(data_path, destination)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        return session
+
+    def restore(self, session: Dict[str, Any], source: Path):
+        """Move a finalized file back into its session (e.g. after validation rejected it) so it can be completed
+        again without re-sending any chunk"""
+        os.replace(source, self._data_path(session["upload_id"]))
+        with self._lock:
+            self._save(session)
+
+    def abort(self, upload_id: str):
+        self._load(upload_id)
+        self._data_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+
+    def expire(self):
+        """Remove sessions idle for longer than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        for meta_path in self.root.glob("*.json"):
+            try:
+                if meta_path.stat().st_mtime < cutoff:
+                    upload_id = meta_path.stem
+                    self._data_path(upload_id).unlink(missing_ok=True)
+                    meta_path.unlink(missing_ok=True)
+            except OSError:
+                continue
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        if not self.root.exists():
+            return []
+        sessions = []
+        for meta_path in sorted(self.root.glob("*.json")):
+            try:
+                sessions.append(self.status(meta_path.stem))
+            except UploadError:
+                continue
+        return sessions
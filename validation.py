@@ -0,0 +1,447 @@
+"""
+Ingest-time data quality validation
+An upload is profiled in one chunked pass (null rates, type consistency, numeric ranges and a bounded value sample,
+category shares) and checked against range rules and against the report of the previous version of the same dataset,
+so shifted columns, unit changes and emptied fields are caught before a file reaches the caches and rollups.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_SIZE = 2_000  # Values kept per numeric column (bottom-k random sample) for medians and bin edges
+QUANTILES = np.linspace(0.1, 0.9, 9)  # Bin edges of the distributions compared across versions
+MAX_CATEGORIES = 1_000  # Distinct values counted per text column; beyond that it is treated as free text
+TOP_CATEGORIES = 50  # Category shares kept in a report
+PROBE_VALUES = 100  # Text values per chunk (spread over it) tried as numbers and timestamps
+TYPE_SHARE = 0.9  # Share of non-null values that must parse for a column to count as numeric or date
+INVALID_ERROR_SHARE = 0.01  # Non-numeric values in a numeric column above this share are an error, below a warning
+OUT_OF_RANGE_ERROR_SHARE = 0.01
+NULL_RATE_INCREASE = 0.2  # Rise in a column's null rate (absolute) that is reported
+SCALE_CHANGE = 10.0  # Median ratio to the previous version that suggests a unit change
+PSI_WARNING = 0.25  # Population stability index above which a distribution shift is reported
+UNSEEN_CATEGORY_SHARE = 0.5  # Share of values outside the previous version's categories that is reported
+
+
+def _normalize(name: Any) -> str:
+    return "".join(ch for ch in str(name).lower() if ch.isalnum())
+
+
+def _number(value: Any, digits: int = 6) -> Optional[float]:
+    value = float(value)
+    return round(value, digits) if math.isfinite(value) else None
+
+
+def range_for(column: str, ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]):
+    """(low, high) bounds of the first range rule whose normalized name occurs in the column name"""
+    normalized = _normalize(column)
+    for hint, bounds in (ranges or {}).items():
+        if _normalize(hint) in normalized:
+            return bounds
+    return None
+
+
+class _ColumnStats:
+    """Running statistics of one column, updated chunk by chunk"""
+
+    def __init__(self, name: str, edges: Optional[List[float]] = None, bounds=None, seed: int = 0):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.kinds: Counter = Counter()  # Non-null values per kind: number, date, boolean, text
+        self.invalid_examples: List[str] = []
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sample = np.empty(0)
+        self.priorities = np.empty(0)
+        self.edges = np.asarray(edges, dtype=np.float64) if edges else None
+        self.bins = np.zeros(len(edges) + 1) if edges else None  # Values per bin of the previous version's edges
+        self.bounds = bounds
+        self.out_of_range = 0
+        self.categories: Counter = Counter()
+        self.free_text = False
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, series):
+        self.rows += len(series)
+        values = series[series.notna()]
+        blank = 0
+        if pd.api.types.is_bool_dtype(values):
+            self.kinds["boolean"] += len(values)
+            self._add_categories(values.astype(str))
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            self.kinds["date"] += len(values)
+        elif pd.api.types.is_numeric_dtype(values):
+            self.kinds["number"] += len(values)
+            self._add_numbers(values.to_numpy(dtype=np.float64))
+        else:
+            text = values.astype(str)
+            text = text[text != ""]
+            blank = len(values) - len(text)
+            # Full numeric parse only when a probe spread over the chunk finds numbers (text columns skip it)
+            step = max(len(text) // PROBE_VALUES, 1)
+            if pd.to_numeric(text.iloc[::step], errors="coerce").notna().any():
+                numbers = pd.to_numeric(text, errors="coerce")
+                parsed = numbers.notna().to_numpy()
+            else:
+                numbers, parsed = None, np.zeros(len(text), dtype=bool)
+            if parsed.any():
+                self.kinds["number"] += int(parsed.sum())
+                self._add_numbers(numbers[parsed].to_numpy(dtype=np.float64))
+            rest = text[~parsed]
+            if len(rest):
+                dates = pd.to_datetime(rest.iloc[::max(len(rest) // PROBE_VALUES, 1)], errors="coerce", format="mixed")
+                self.kinds["date" if dates.notna().mean() >= TYPE_SHARE else "text"] += len(rest)
+                self._add_categories(rest)
+                for value in rest.iloc[:5]:
+                    if len(self.invalid_examples) < 5 and value not in self.invalid_examples:
+                        self.invalid_examples.append(value)
+        self.nulls += len(series) - len(values) + blank
+
+    def _add_categories(self, values):
+        if self.free_text:
+            return
+        self.categories.update(values.value_counts().to_dict())
+        if len(self.categories) > MAX_CATEGORIES:
+            self.free_text = True
+            self.categories.clear()
+
+    def _add_numbers(self, x: np.ndarray):
+        x = x[np.isfinite(x)]
+        k = len(x)
+        if not k:
+            return
+        # Chan et al. merge of chunk mean and sum of squared deviations
+        mean = float(x.mean())
+        m2 = float(((x - mean) ** 2).sum())
+        total = self.count + k
+        delta = mean - self.mean
+        self.mean += delta * k / total
+        self.m2 += m2 + delta * delta * self.count * k / total
+        self.count = total
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+
+        # Bottom-k sampling: every value gets a random priority and the SAMPLE_SIZE smallest are kept
+        priorities = self.rng.random(k)
+        self.sample = np.concatenate([self.sample, x])
+        self.priorities = np.concatenate([self.priorities, priorities])
+        if len(self.sample) > SAMPLE_SIZE:
+            keep = np.argpartition(self.priorities, SAMPLE_SIZE)[:SAMPLE_SIZE]
+            self.sample, self.priorities = self.sample[keep], self.priorities[keep]
+
+        if self.edges is not None:
+            self.bins += np.bincount(np.searchsorted(self.edges, x, side="right"), minlength=len(self.edges) + 1)
+        if self.bounds is not None:
+            low, high = self.bounds
+            outside = np.zeros(k, dtype=bool)
+            if low is not None:
+                outside |= x < low
+            if high is not None:
+                outside |= x > high
+            self.out_of_range += int(outside.sum())
+
+    def result(self) -> Dict[str, Any]:
+        present = sum(self.kinds.values())
+        if not present:
+            kind = "empty"
+        elif self.kinds["boolean"] == present:
+            kind = "boolean"
+        elif self.kinds["number"] >= TYPE_SHARE * present:
+            kind = "number"
+        elif self.kinds["date"] >= TYPE_SHARE * present:
+            kind = "date"
+        else:
+            kind = "text"
+        profile = {
+            "name": self.name,
+            "kind": kind,
+            "nulls": self.nulls,
+            "null_rate": round(self.nulls / self.rows, 4) if self.rows else 0.0,
+        }
+        if kind == "number" and self.count:
+            edges = np.quantile(self.sample, QUANTILES)
+            shares = np.bincount(np.searchsorted(edges, self.sample, side="right"), minlength=len(edges) + 1)
+            profile.update({
+                "invalid": present - self.kinds["number"],
+                "invalid_examples": self.invalid_examples if present > self.kinds["number"] else [],
+                "min": _number(self.min), "max": _number(self.max), "mean": _number(self.mean),
+                "std": _number(math.sqrt(self.m2 / self.count)), "median": _number(np.median(self.sample)),
+                "edges": [float(e) for e in edges],
+                "edge_shares": [round(float(s), 6) for s in shares / len(self.sample)],
+            })
+            if self.bins is not None:
+                profile["previous_bins"] = [int(b) for b in self.bins]
+            if self.bounds is not None:
+                profile["bounds"] = list(self.bounds)
+                profile["out_of_range"] = self.out_of_range
+        elif kind in ("text", "boolean"):
+            if self.kinds["number"]:
+                profile["number_share"] = round(self.kinds["number"] / present, 4)
+            profile["distinct"] = None if self.free_text else len(self.categories)
+            total = sum(self.categories.values())
+            profile["categories"] = {str(value): round(count / total, 6)
+                                     for value, count in self.categories.most_common(TOP_CATEGORIES)}
+        return profile
+
+
+def profile_chunks(chunks: Iterable[Any], baseline: Optional[Dict[str, Any]] = None,
+                   ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+                   seed: int = 0) -> Dict[str, Any]:
+    """Column profiles of a dataset streamed as DataFrame chunks.
+
+    Numeric values are also binned on the previous version's bin edges (from `baseline`) during the same pass, so
+    the distributions can be compared without reading the previous version again.
+    """
+    previous = (baseline or {}).get("columns", {})
+    columns: Dict[str, _ColumnStats] = {}
+    rows = 0
+    for chunk in chunks:
+        for name in chunk.columns:
+            key = str(name)
+            stats = columns.get(key)
+            if stats is None:
+                stats = columns[key] = _ColumnStats(key, previous.get(key, {}).get("edges"), range_for(key, ranges), seed)
+                stats.rows = stats.nulls = rows  # Missing from earlier chunks (e.g. keys absent in JSON records)
+            stats.add(chunk[name])
+        for stats in columns.values():
+            if stats.rows < rows + len(chunk):
+                stats.nulls += rows + len(chunk) - stats.rows
+                stats.rows = rows + len(chunk)
+        rows += len(chunk)
+    return {"rows": rows, "schema": list(columns), "columns": {name: s.result() for name, s in columns.items()}}
+
+
+def _psi(expected: List[float], counts: List[int]) -> float:
+    """Population stability index of observed bin counts against expected bin shares"""
+    actual = np.asarray(counts, dtype=np.float64)
+    if not actual.sum():
+        return 0.0
+    actual = np.maximum(actual / actual.sum(), 1e-4)
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), 1e-4)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def _issue(severity: str, check: str, message: str, column: Optional[str] = None, **details) -> Dict[str, Any]:
+    return {"severity": severity, "check": check, "column": column, "message": message, **details}
+
+
+def _label(baseline: Dict[str, Any]) -> str:
+    return f"version {baseline['version']}" if baseline.get("version") is not None else "the previous upload"
+
+
+def check_profile(profile: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Checks of the upload itself: empty files and columns, type consistency, range rules"""
+    issues = []
+    if not profile["rows"]:
+        issues.append(_issue("error", "empty", "The file has no data rows"))
+        return issues
+    previous = (baseline or {}).get("columns", {})
+    for name, column in profile["columns"].items():
+        if column["kind"] == "empty":
+            if previous.get(name, {}).get("kind", "empty") != "empty":
+                issues.append(_issue("error", "null_rate",
+                                     f"Column '{name}' is empty but had values in {_label(baseline)}", name))
+            else:
+                issues.append(_issue("warning", "null_rate", f"Column '{name}' has no values", name))
+        elif column["kind"] == "number":
+            present = profile["rows"] - column["nulls"]
+            if column.get("invalid"):
+                share = column["invalid"] / present
+                examples = ", ".join(repr(v) for v in column["invalid_examples"][:3])
+                issues.append(_issue(
+                    "error" if share > INVALID_ERROR_SHARE else "warning", "type_consistency",
+                    f"{column['invalid']} values of numeric column '{name}' are not numbers ({share:.1%}), e.g. {examples}",
+                    name, share=round(share, 4)
+                ))
+            if column.get("out_of_range"):
+                share = column["out_of_range"] / present
+                low, high = column["bounds"]
+                issues.append(_issue(
+                    "error" if share > OUT_OF_RANGE_ERROR_SHARE else "warning", "range",
+                    f"{column['out_of_range']} values of '{name}' are outside "
+                    f"[{'-inf' if low is None else low}, {'inf' if high is None else high}] ({share:.1%})",
+                    name, share=round(share, 4)
+                ))
+        elif column.get("number_share", 0) >= 0.5:
+            issues.append(_issue(
+                "warning", "type_consistency",
+                f"Column '{name}' mixes numbers ({column['number_share']:.0%}) and text", name
+            ))
+    return issues
+
+
+def compare_profiles(profile: Dict[str, Any], baseline: Dict[str, Any], mode: str = "replace") -> List[Dict[str, Any]]:
+    """Schema and distribution drift of an upload against the previous version's report"""
+    issues = []
+    label = _label(baseline)
+    previous, current = baseline["columns"], profile["columns"]
+
+    removed = [name for name in baseline["schema"] if name not in current]
+    added = [name for name in profile["schema"] if name not in previous]
+    if removed:
+        issues.append(_issue("error", "schema", f"Columns missing compared to {label}: {', '.join(removed)}",
+                             columns=removed))
+    if added:
+        # Appended segments are concatenated with the earlier ones, so their columns must line up exactly
+        issues.append(_issue("error" if mode == "append" else "warning", "schema",
+                             f"Columns not in {label}: {', '.join(added)}", columns=added))
+
+    changed = []
+    for name in (n for n in profile["schema"] if n in previous):
+        before, after = previous[name], current[name]
+        if after["kind"] == "empty":
+            continue  # Reported by check_profile
+        if before["kind"] != after["kind"] and before["kind"] != "empty":
+            changed.append(name)
+            issues.append(_issue("error", "type_change",
+                                 f"Column '{name}' changed from {before['kind']} to {after['kind']}", name))
+            continue
+        if after["null_rate"] - before["null_rate"] >= NULL_RATE_INCREASE:
+            issues.append(_issue("warning", "null_rate",
+                                 f"Null rate of '{name}' rose from {before['null_rate']:.0%} to {after['null_rate']:.0%}",
+                                 name))
+
+        if after["kind"] == "number" and before.get("median") and after.get("median"):
+            ratio = after["median"] / before["median"]
+            if ratio >= SCALE_CHANGE or 0 < ratio <= 1 / SCALE_CHANGE:
+                issues.append(_issue(
+                    "error", "scale",
+                    f"Values of '{name}' are {ratio:.3g}x those of {label} (median {before['median']:g} -> "
+                    f"{after['median']:g}); units may have changed", name, ratio=round(ratio, 4)
+                ))
+                continue
+        if after["kind"] == "number" and "previous_bins" in after and before.get("edge_shares"):
+            psi = _psi(before["edge_shares"], after["previous_bins"])
+            after["psi"] = round(psi, 4)
+            if psi > PSI_WARNING:
+                issues.append(_issue("warning", "drift",
+                                     f"Distribution of '{name}' shifted from {label} (PSI {psi:.2f})", name,
+                                     psi=round(psi, 4)))
+        elif after.get("categories") and before.get("distinct") is not None and before["distinct"] <= TOP_CATEGORIES:
+            unseen = sum(share for value, share in after["categories"].items() if value not in before["categories"])
+            if unseen >= UNSEEN_CATEGORY_SHARE:
+                issues.append(_issue("warning", "drift",
+                                     f"{unseen:.0%} of '{name}' values are categories not seen in {label}", name,
+                                     share=round(unseen, 4)))
+
+    if len(changed) >= 2:
+        issues.append(_issue("error", "schema",
+                             f"Types changed in {len(changed)} columns ({', '.join(changed)}); columns may be shifted",
+                             columns=changed))
+    return issues
+
+
+def validate(chunks: Iterable[Any], baseline: Optional[Dict[str, Any]] = None,
+             ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+             mode: str = "replace") -> Dict[str, Any]:
+    """Quality report of a dataset streamed as chunks, compared with `baseline` (the previous version's report)"""
+    started = time.perf_counter()
+    profile = profile_chunks(chunks, baseline, ranges)
+    issues = check_profile(profile, baseline)
+    if baseline is not None and profile["rows"]:
+        issues += compare_profiles(profile, baseline, mode)
+    cells = profile["rows"] * len(profile["schema"])
+    nulls = sum(column["nulls"] for column in profile["columns"].values())
+    severities = {issue["severity"] for issue in issues}
+    return {
+        "status": "failed" if "error" in severities else "warning" if severities else "passed",
+        "rows": profile["rows"],
+        "column_count": len(profile["schema"]),
+        "completeness": round(1 - nulls / cells, 4) if cells else 0.0,
+        "mode": mode,
+        "baseline_version": baseline.get("version") if baseline is not None else None,
+        "issues": issues,
+        "schema": profile["schema"],
+        "columns": profile["columns"],
+        "checked_at": datetime.now().isoformat(),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def summary(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Report without the column profiles"""
+    return {
+        "status": report["status"],
+        "version": report.get("version"),
+        "rows": report["rows"],
+        "completeness": report["completeness"],
+        "errors": sum(1 for issue in report["issues"] if issue["severity"] == "error"),
+        "warnings": sum(1 for issue in report["issues"] if issue["severity"] == "warning"),
+        "checked_at": report["checked_at"],
+    }
+
+
+class QualityReportStore:
+    """Quality reports per dataset under <root>/<dataset name>.json, oldest first"""
+
+    def __init__(self, root: Path, keep: int = 10):
+        self.root = Path(root)
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._reports: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}  # name -> (file mtime_ns, reports)
+
+    def _path(self, name: str) -> Path:
+        if not name or "/" in name or "\\" in name or name.startswith("."):
+            raise ValueError(f"Invalid dataset name: {name}")
+        return self.root / f"{name}.json"
+
+    def reports(self, name: str) -> List[Dict[str, Any]]:
+        path = self._path(name)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._reports.get(name)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+        try:
+            with open(path) as f:
+                reports = json.load(f)["reports"]
+        except (OSError, ValueError, KeyError):
+            return []
+        with self._lock:
+            self._reports[name] = (mtime_ns, reports)
+        return reports
+
+    def latest(self, name: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Newest report, or the newest one of a dataset version"""
+        for report in reversed(self.reports(name)):
+            if version is None or report.get("version") == version:
+                return report
+        return None
+
+    def history(self, name: str) -> List[Dict[str, Any]]:
+        return [summary(report) for report in self.reports(name)]
+
+    def save(self, name: str, report: Dict[str, Any]):
+        path = self._path(name)
+        reports = (self.reports(name) + [report])[-self.keep:]
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"reports": reports}, f, default=str)
+            os.replace(tmp_path, path)
+            self._reports[name] = (path.stat().st_mtime_ns, reports)
+
+    def delete(self, name: str):
+        with self._lock:
+            self._reports.pop(name, None)
+            try:
+                self._path(name).unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,307 @@
+"""
+Data folder watcher and in-memory dataset catalog
+Files dropped into the data folder by SMB shares or cron jobs are picked up with inotify on Linux (polling elsewhere),
+debounced until writes settle, and only the changed files are re-profiled. Request handlers read the catalog
+instead of listing the directory.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+OPERATION_TYPES = ("terminal", "courier", "workforce", "energy")
+# Editor/transfer temporaries that must never be catalogued
+IGNORED_PREFIXES = (".", "~$")
+IGNORED_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload", ".swp")
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+RESCAN = None  # Returned by a backend when individual events were lost
+
+
+def file_version(file_path: Path) -> Optional[str]:
+    try:
+        stats = file_path.stat()
+    except OSError:
+        return None
+    return f"{stats.st_mtime_ns}-{stats.st_size}"
+
+
+def operation_type_from_name(name: str, default: str = "terminal") -> str:
+    """Operation type encoded in the `<operation_type>_<file name>` upload convention"""
+    prefix = name.split("_", 1)[0].lower()
+    return prefix if prefix in OPERATION_TYPES else default
+
+
+class CatalogEntry:
+    __slots__ = ("path", "version", "info", "error", "indexed_at")
+
+    def __init__(self, path: Path, version: str, info: Any = None, error: Optional[str] = None):
+        self.path = path
+        self.version = version
+        self.info = info
+        self.error = error
+        self.indexed_at = time.time()
+
+
+class DatasetCatalog:
+    """Dataset files of one folder with their profiles, updated file by file"""
+
+    def __init__(self, root: Path, extensions: Sequence[str], profiler: Callable[[Path], Any],
+                 on_remove: Optional[Callable[[Path], None]] = None):
+        self.root = Path(root)
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.profiler = profiler
+        self.on_remove = on_remove
+        self.ready = False  # Set once the initial scan has completed
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._lock = threading.Lock()
+
+    def accepts(self, name: str) -> bool:
+        lowered = name.lower()
+        return (Path(lowered).suffix in self.extensions and not lowered.startswith(IGNORED_PREFIXES)
+                and not lowered.endswith(IGNORED_SUFFIXES))
+
+    def refresh(self, file_path: Path, info: Any = None) -> bool:
+        """(Re-)profile one file if its version changed; `info` records a profile the caller already computed"""
+        version = file_version(file_path)
+        if version is None:
+            self.remove(file_path.name)
+            return False
+        with self._lock:
+            current = self._entries.get(file_path.name)
+            if current is not None and current.version == version and info is None:
+                return False
+        error = None
+        if info is None:
+            try:
+                info = self.profiler(file_path)
+            except Exception as e:
+                error = str(e)
+                print(f"⚠️ Could not index {file_path.name}: {e}")
+        with self._lock:
+            self._entries[file_path.name] = CatalogEntry(file_path, version, info, error)
+        return True
+
+    def remove(self, name: str):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+        if entry is not None and self.on_remove is not None:
+            try:
+                self.on_remove(entry.path)
+            except Exception as e:
+                print(f"⚠️ Cleanup for {name} failed: {e}")
+
+    def sync(self):
+        """Reconcile with a full directory listing (startup and lost-event recovery)"""
+        present = set()
+        if self.root.exists():
+            for file_path in self.root.iterdir():
+                if file_path.is_file() and self.accepts(file_path.name):
+                    present.add(file_path.name)
+                    self.refresh(file_path)
+        with self._lock:
+            missing = [name for name in self._entries if name not in present]
+        for name in missing:
+            self.remove(name)
+        self.ready = True
+
+    def _matching(self, operation_type: Optional[str]) -> List[CatalogEntry]:
+        with self._lock:
+            entries = list(self._entries.values())
+        if operation_type:
+            entries = [e for e in entries if e.path.name.startswith(f"{operation_type}_")]
+        return sorted(entries, key=lambda e: e.path.name)
+
+    def files(self, operation_type: Optional[str] = None) -> List[Path]:
+        return [e.path for e in self._matching(operation_type)]
+
+    def infos(self, operation_type: Optional[str] = None) -> List[Any]:
+        return [e.info for e in self._matching(operation_type) if e.info is not None]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "ready": self.ready,
+                "datasets": len(self._entries),
+                "errors": {name: e.error for name, e in self._entries.items() if e.error},
+            }
+
+
+class _InotifyBackend:
+    """Directory events through the inotify syscalls (ctypes, no extra dependency)"""
+
+    name = "inotify"
+
+    def __init__(self, root: Path):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(root)), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {root}")
+
+    def poll(self, timeout: float) -> Optional[Set[str]]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names: Set[str] = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            raw_name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                return RESCAN
+            if raw_name:
+                names.add(os.fsdecode(raw_name))
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingBackend:
+    """Portable fallback comparing (mtime, size) snapshots of the folder"""
+
+    name = "polling"
+
+    def __init__(self, root: Path, interval: float):
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stats = entry.stat()
+                        snapshot[entry.name] = (stats.st_mtime_ns, stats.st_size)
+        except OSError:
+            pass
+        return snapshot
+
+    def poll(self, timeout: float) -> Optional[Set[str]]:
+        time.sleep(self.interval)
+        current = self._scan()
+        changed = {name for name in current.keys() | self._snapshot.keys()
+                   if current.get(name) != self._snapshot.get(name)}
+        self._snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class DataFolderWatcher:
+    """Background thread feeding file changes into a DatasetCatalog.
+
+    A changed file is indexed once it has produced no events and kept the same size and mtime for
+    `debounce_seconds`, so half-written SMB/cron copies are not profiled.
+    """
+
+    def __init__(self, catalog: DatasetCatalog, debounce_seconds: float = 1.0, poll_interval: float = 2.0,
+                 use_inotify: bool = True):
+        self.catalog = catalog
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.backend_name: Optional[str] = None
+        self._pending: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_backend(self):
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                return _InotifyBackend(self.catalog.root)
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify unavailable ({e}), polling {self.catalog.root} instead")
+        return _PollingBackend(self.catalog.root, self.poll_interval)
+
+    def start(self):
+        self.catalog.root.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="data-folder-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        # Subscribe before the initial scan so files written during it are not missed
+        backend = self._open_backend()
+        self.backend_name = backend.name
+        try:
+            self.catalog.sync()
+            while not self._stop.is_set():
+                changed = backend.poll(min(self.debounce_seconds, self.poll_interval) / 2 or 0.1)
+                if changed is RESCAN:
+                    # Events were dropped or the folder itself was replaced: re-subscribe and reconcile
+                    backend.close()
+                    self.catalog.root.mkdir(parents=True, exist_ok=True)
+                    backend = self._open_backend()
+                    self.catalog.sync()
+                    continue
+                now = time.monotonic()
+                for name in changed:
+                    if self.catalog.accepts(name):
+                        self._pending[name] = (now, file_version(self.catalog.root / name))
+                self._flush(now)
+        except Exception as e:
+            print(f"⚠️ Data folder watcher stopped: {e}")
+        finally:
+            backend.close()
+
+    def _flush(self, now: float):
+        for name, (last_event, last_version) in list(self._pending.items()):
+            if now - last_event < self.debounce_seconds:
+                continue
+            file_path = self.catalog.root / name
+            version = file_version(file_path)
+            if version != last_version:
+                self._pending[name] = (now, version)  # Still being written
+                continue
+            del self._pending[name]
+            if version is None:
+                self.catalog.remove(name)
+            else:
+                self.catalog.refresh(file_path)
+
+    def status(self) -> Dict[str, Any]:
+        return {**self.catalog.status(), "backend": self.backend_name, "pending": sorted(self._pending)}
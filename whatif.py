@@ -0,0 +1,211 @@
+"""
+Batched what-if parameter sweeps for the What-If Analysis view
+Every combination of the SimulationParameters grid is evaluated in one broadcast NumPy computation,
+using the same impact model as the client-side simulation, and the Pareto-optimal configurations are returned
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Defaults mirror the WhatIfAnalysis.tsx sliders
+PARAMETER_DEFAULTS: Dict[str, Any] = {
+    "workforceLevel": 100,
+    "bayAllocation": "balanced",
+    "truckFrequency": False,
+    "cargoPriority": False,
+    "equipmentCapacity": 100,
+    "processTime": 100,
+}
+NUMERIC_PARAMETERS = ("workforceLevel", "equipmentCapacity", "processTime")
+BAY_MULTIPLIERS = {"balanced": 1.0, "priority": 1.08, "optimized": 1.15}
+FREQUENCY_BONUS = 1.1
+PRIORITY_BONUS = 1.05
+
+# Client-side baseline; throughput/errorRate/waitingTime/costEfficiency are replaced by real KPIs when available
+DEFAULT_BASELINE = {
+    "throughput": 2847,
+    "waitingTime": 3.2,
+    "costEfficiency": 87.5,
+    "utilization": 78.3,
+    "errorRate": 2.1,
+    "energyUsage": 245,
+    "operatingCost": 100.0,  # Cost index at 100% workforce and equipment
+}
+KPI_GOALS = {
+    "throughput": "max", "waitingTime": "min", "costEfficiency": "max", "utilization": "max",
+    "errorRate": "min", "energyUsage": "min", "operatingCost": "min",
+}
+DEFAULT_OBJECTIVES = [{"kpi": "throughput", "goal": "max"}, {"kpi": "operatingCost", "goal": "min"}]
+MAX_COMBINATIONS = 2_000_000
+MAX_INCLUDE_ALL = 10_000  # Largest grid whose every projection can be returned with include_all
+
+
+def expand_values(name: str, spec: Any) -> List[Any]:
+    """Parameter spec -> list of values: a scalar, a list, or {"start", "stop", "step"} / {"min", "max", "num"}"""
+    if spec is None:
+        return [PARAMETER_DEFAULTS[name]]
+    if isinstance(spec, dict):
+        if name not in NUMERIC_PARAMETERS:
+            raise ValueError(f"{name} only accepts a list of values")
+        if "num" in spec:
+            return np.linspace(float(spec["min"]), float(spec["max"]), int(spec["num"])).tolist()
+        start, stop, step = float(spec["start"]), float(spec["stop"]), float(spec.get("step", 5))
+        if step <= 0:
+            raise ValueError(f"{name}: step must be positive")
+        return np.arange(start, stop + step / 2, step).tolist()
+    values = list(spec) if isinstance(spec, (list, tuple)) else [spec]
+    if not values:
+        raise ValueError(f"{name}: no values given")
+    if name == "bayAllocation":
+        unknown = [v for v in values if v not in BAY_MULTIPLIERS]
+        if unknown:
+            raise ValueError(f"Unknown bayAllocation {unknown}. Use one of {', '.join(BAY_MULTIPLIERS)}")
+    elif name in ("truckFrequency", "cargoPriority"):
+        values = [bool(v) for v in values]
+    else:
+        values = [float(v) for v in values]
+        if name == "processTime" and min(values) <= 0:
+            raise ValueError("processTime must be positive")
+    return values
+
+
+def build_grid(parameters: Dict[str, Any]) -> Dict[str, List[Any]]:
+    unknown = set(parameters) - set(PARAMETER_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    grid = {name: expand_values(name, parameters.get(name)) for name in PARAMETER_DEFAULTS}
+    total = int(np.prod([len(v) for v in grid.values()], dtype=np.int64))
+    if total > MAX_COMBINATIONS:
+        raise ValueError(f"{total} combinations requested; the limit is {MAX_COMBINATIONS}")
+    return grid
+
+
+def evaluate_grid(grid: Dict[str, List[Any]], baseline: Dict[str, float]) -> Tuple[Dict[str, np.ndarray], Tuple[int, ...]]:
+    """Projected KPIs for every combination; each parameter is its own broadcast axis"""
+    names = list(PARAMETER_DEFAULTS)
+    ndim = len(names)
+
+    def axis(name: str, values) -> np.ndarray:
+        shape = [1] * ndim
+        shape[names.index(name)] = len(values)
+        return np.asarray(values, dtype=np.float64).reshape(shape)
+
+    workforce = axis("workforceLevel", grid["workforceLevel"]) / 100
+    bay = axis("bayAllocation", [BAY_MULTIPLIERS[v] for v in grid["bayAllocation"]])
+    frequency = axis("truckFrequency", [FREQUENCY_BONUS if v else 1.0 for v in grid["truckFrequency"]])
+    priority = axis("cargoPriority", [PRIORITY_BONUS if v else 1.0 for v in grid["cargoPriority"]])
+    equipment = axis("equipmentCapacity", grid["equipmentCapacity"]) / 100
+    process = 100 / axis("processTime", grid["processTime"])
+
+    multiplier = workforce * bay * equipment * process * frequency * priority
+    shape = multiplier.shape
+
+    # Resource cost: labour and equipment dominate, extra truck slots and prioritization add overhead
+    cost = baseline["operatingCost"] * (0.55 * workforce + 0.35 * equipment + 0.10) \
+        * np.where(frequency > 1, 1.06, 1.0) * np.where(priority > 1, 1.02, 1.0)
+
+    kpis = {
+        "throughput": baseline["throughput"] * multiplier,
+        "waitingTime": baseline["waitingTime"] / multiplier,
+        "costEfficiency": np.minimum(100, baseline["costEfficiency"] * multiplier),
+        "utilization": np.minimum(100, baseline["utilization"] * multiplier),
+        "errorRate": np.maximum(0.1, baseline["errorRate"] / multiplier),
+        "energyUsage": baseline["energyUsage"] / (multiplier * 0.8),
+        "operatingCost": np.broadcast_to(cost, shape),
+    }
+    return {name: np.broadcast_to(values, shape).ravel() for name, values in kpis.items()}, shape
+
+
+PARETO_BLOCK_ROWS = 4096  # Candidates checked against the current front at once when there are 3+ objectives
+
+
+def pareto_front(objectives: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """Indices of non-dominated rows (the first `limit` in lexicographic order); objectives are (n, k), all maximized.
+
+    Rows are visited in lexicographically descending order, so a row can only be dominated by an earlier one.
+    With two objectives that is a single running-maximum scan. Otherwise rows are checked in blocks against the
+    front found so far, only the block's survivors are resolved among themselves, and the scan stops once `limit`
+    rows are found. Rows with identical objective values are collapsed to the first one.
+    """
+    order = np.lexsort(objectives.T[::-1])[::-1]
+    ordered = objectives[order]
+    if objectives.shape[1] == 2:
+        previous_best = np.maximum.accumulate(ordered[:, 1])
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = ordered[1:, 1] > previous_best[:-1]
+        return order[keep][:limit]
+
+    limit = len(order) if limit is None else limit
+    front: List[int] = []
+    front_values = np.empty((0, objectives.shape[1]))
+    for block_start in range(0, len(order), PARETO_BLOCK_ROWS):
+        values = ordered[block_start:block_start + PARETO_BLOCK_ROWS]
+        positions = np.arange(block_start, block_start + len(values))
+        if len(front_values):
+            dominated = np.all(values[:, None, :] <= front_values[None, :, :], axis=2).any(axis=1)
+            values, positions = values[~dominated], positions[~dominated]
+        found = []
+        while len(positions) and len(front) + len(found) < limit:
+            found.append(positions[0])
+            survivors = ~np.all(values[1:] <= values[0], axis=1)
+            values, positions = values[1:][survivors], positions[1:][survivors]
+        if found:
+            front.extend(found)
+            front_values = ordered[front]
+        if len(front) >= limit:
+            break
+    return order[np.asarray(front, dtype=np.int64)]
+
+
+def sweep(parameters: Dict[str, Any], baseline_overrides: Optional[Dict[str, float]] = None,
+          objectives: Optional[Sequence[Dict[str, str]]] = None, include_all: bool = False,
+          max_pareto: int = 200) -> Dict[str, Any]:
+    """Evaluate the whole parameter grid and return projected KPIs and Pareto-optimal configurations"""
+    baseline = {**DEFAULT_BASELINE, **{k: float(v) for k, v in (baseline_overrides or {}).items() if k in DEFAULT_BASELINE}}
+    objectives = list(objectives or DEFAULT_OBJECTIVES)
+    for objective in objectives:
+        if objective.get("kpi") not in KPI_GOALS:
+            raise ValueError(f"Unknown objective KPI: {objective.get('kpi')}. Use one of {', '.join(KPI_GOALS)}")
+        if objective.get("goal", KPI_GOALS[objective["kpi"]]) not in ("max", "min"):
+            raise ValueError("Objective goal must be 'max' or 'min'")
+
+    grid = build_grid(parameters)
+    if include_all and np.prod([len(v) for v in grid.values()], dtype=np.int64) > MAX_INCLUDE_ALL:
+        raise ValueError(f"include_all is limited to {MAX_INCLUDE_ALL} combinations; narrow the grid or omit it")
+    kpis, shape = evaluate_grid(grid, baseline)
+    total = int(np.prod(shape))
+
+    signs = [1.0 if o.get("goal", KPI_GOALS[o["kpi"]]) == "max" else -1.0 for o in objectives]
+    matrix = np.column_stack([kpis[o["kpi"]] * s for o, s in zip(objectives, signs)])
+    front = pareto_front(matrix, max_pareto)
+
+    def configuration(flat_index: int) -> Dict[str, Any]:
+        position = np.unravel_index(flat_index, shape)
+        config = {name: grid[name][i] for name, i in zip(PARAMETER_DEFAULTS, position)}
+        return {
+            "parameters": config,
+            "kpis": {name: round(float(values[flat_index]), 2) for name, values in kpis.items()},
+        }
+
+    best = {}
+    for name, values in kpis.items():
+        index = int(np.argmax(values) if KPI_GOALS[name] == "max" else np.argmin(values))
+        best[name] = configuration(index)
+
+    result = {
+        "combinations": total,
+        "grid": grid,
+        "baseline": baseline,
+        "objectives": [{"kpi": o["kpi"], "goal": o.get("goal", KPI_GOALS[o["kpi"]])} for o in objectives],
+        "pareto": [configuration(int(i)) for i in front],
+        "best": best,
+    }
+    if include_all:
+        # Columnar layout: parameter indices per axis plus one array per KPI, in C (row-major) grid order
+        result["all"] = {
+            "shape": list(shape),
+            "axes": list(PARAMETER_DEFAULTS),
+            "kpis": {name: np.round(values, 2).tolist() for name, values in kpis.items()},
+        }
+    return result